@@ -19,12 +19,18 @@ Credentials are persisted to Google Cloud Datastore.
 
 from __future__ import annotations
 
+import collections
+import functools
 import logging
 import os
+import queue
+import random
+import threading
 import time
 import requests
 from typing import Any
 
+import cachecontrol
 import flask
 import jwt
 from google.auth.transport import requests as auth_requests
@@ -36,24 +42,100 @@ from google_auth_oauthlib import flow
 CLIENT_SECRETS_PATH = os.environ.get("CLIENT_SECRETS_PATH", "client_secrets.json")
 SESSION_SECRET = os.environ.get("SESSION_SECRET", "notasecret")
 
+# Seconds that user credentials are kept in memory before reading them again.
+CREDENTIALS_CACHE_TTL = float(os.environ.get("CREDENTIALS_CACHE_TTL", "300"))
+
+# Maximum number of users whose credentials are kept in memory.
+CREDENTIALS_CACHE_SIZE = int(os.environ.get("CREDENTIALS_CACHE_SIZE", "10000"))
+
+# Endpoint that revokes OAuth2 tokens.
+REVOKE_URL = "https://oauth2.googleapis.com/revoke"
+
+# Seconds to wait for the revoke endpoint before giving up on an attempt.
+REVOKE_TIMEOUT = 10
+
+# Maximum number of attempts to revoke a token.
+REVOKE_MAX_ATTEMPTS = 3
+
+# Number of threads that revoke tokens in the background.
+REVOKE_WORKERS = 2
+
+# Maximum number of tokens waiting to be revoked.
+REVOKE_QUEUE_SIZE = 1000
+
 mod = flask.Blueprint("auth", __name__)
 
 # Scopes required to access the People API.
 PEOPLE_API_SCOPES = ["https://www.googleapis.com/auth/userinfo.profile"]
 
 
+@functools.cache
+def get_datastore_client() -> datastore.Client:
+    """Returns the Datastore client of the process, created on first use."""
+    return datastore.Client()
+
+
+class CredentialsCache:
+    """In-memory cache of user credentials that expire after a TTL.
+
+    When full, the least recently used entry is evicted.
+    """
+    def __init__(self, ttl: float, max_size: int) -> CredentialsCache:
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_name: str) -> Credentials | None:
+        """Returns the cached credentials of a user, if not expired."""
+        with self.lock:
+            entry = self.entries.get(user_name)
+            if entry is None:
+                return None
+            expiry, creds = entry
+            if expiry < time.monotonic():
+                del self.entries[user_name]
+                return None
+            self.entries.move_to_end(user_name)
+            return creds
+
+    def put(self, user_name: str, creds: Credentials) -> None:
+        """Caches the credentials of a user."""
+        with self.lock:
+            self.entries[user_name] = (time.monotonic() + self.ttl, creds)
+            self.entries.move_to_end(user_name)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, user_name: str) -> None:
+        """Removes the cached credentials of a user."""
+        with self.lock:
+            self.entries.pop(user_name, None)
+
+
+credentials_cache = CredentialsCache(CREDENTIALS_CACHE_TTL, CREDENTIALS_CACHE_SIZE)
+
+
 class Store:
-    """Manages storage in Google Cloud Datastore."""
+    """Manages storage in Google Cloud Datastore.
+
+    Credentials read from Datastore are cached in memory, so repeat requests
+    from the same user don't read them again.
+    """
     def __init__(self) -> Store:
-        self.datastore_client = datastore.Client()
+        self.datastore_client = get_datastore_client()
 
     def get_user_credentials(self, user_name: str) -> Credentials | None:
         """Retrieves stored OAuth2 credentials for a user."""
+        if creds := credentials_cache.get(user_name):
+            return creds
         key = self.datastore_client.key("RefreshToken", user_name)
         entity = self.datastore_client.get(key)
         if entity is None or "credentials" not in entity:
             return None
-        return Credentials(**entity["credentials"])
+        creds = Credentials(**entity["credentials"])
+        credentials_cache.put(user_name, creds)
+        return creds
 
     def put_user_credentials(self, user_name: str, creds: Credentials) -> None:
         """Stores OAuth2 credentials for a user."""
@@ -71,11 +153,106 @@ class Store:
             "timestamp": time.time(),
         })
         self.datastore_client.put(entity)
+        credentials_cache.invalidate(user_name)
 
     def delete_user_credentials(self, user_name: str) -> None:
         """Deleted stored OAuth2 credentials for a user."""
         key = self.datastore_client.key("RefreshToken", user_name)
         self.datastore_client.delete(key)
+        credentials_cache.invalidate(user_name)
+
+
+@functools.cache
+def get_auth_request() -> auth_requests.Request:
+    """Returns the transport used to verify ID tokens.
+
+    It reuses pooled HTTP connections and caches Google's public certificates
+    for as long as their Cache-Control headers allow, so a wave of OAuth2
+    callbacks doesn't download the certificates once per callback.
+    """
+    return auth_requests.Request(session=cachecontrol.CacheControl(requests.Session()))
+
+
+@functools.cache
+def get_http_session() -> requests.Session:
+    """Returns the HTTP session of the process, which reuses connections."""
+    return requests.Session()
+
+
+def revoke_token(token: str) -> bool:
+    """Revokes an OAuth2 token, retrying on network and server errors.
+
+    Returns whether the token is no longer valid: it was revoked, or the revoke
+    endpoint rejected it as invalid because it was already revoked or expired.
+    """
+    for attempt in range(1, REVOKE_MAX_ATTEMPTS + 1):
+        try:
+            response = get_http_session().post(
+                REVOKE_URL,
+                params={ "token": token },
+                headers={ "Content-Type": "application/x-www-form-urlencoded" },
+                timeout=REVOKE_TIMEOUT
+            )
+            if response.status_code < 500 and response.status_code != 429:
+                if response.ok:
+                    return True
+                if is_invalid_token_error(response):
+                    logging.info("Token was already invalid: %s", response.text)
+                    return True
+                logging.warning("Failed to revoke token: %s", response.text)
+                return False
+        except requests.RequestException as e:
+            logging.warning("Error revoking token: %s", e)
+        if attempt < REVOKE_MAX_ATTEMPTS:
+            time.sleep(random.uniform(0, 2 ** attempt))
+    logging.error("Giving up revoking token after %d attempts", REVOKE_MAX_ATTEMPTS)
+    return False
+
+
+def is_invalid_token_error(response: requests.Response) -> bool:
+    """Returns whether the revoke endpoint rejected the token as invalid."""
+    if response.status_code != 400:
+        return False
+    try:
+        return response.json().get("error") == "invalid_token"
+    except ValueError:
+        return False
+
+
+# Tokens waiting to be revoked in the background.
+revoke_queue = queue.Queue(maxsize=REVOKE_QUEUE_SIZE)
+revoke_workers = []
+revoke_workers_lock = threading.Lock()
+
+
+def run_revoke_worker() -> None:
+    """Revokes the tokens in the queue, one at a time."""
+    while True:
+        token = revoke_queue.get()
+        try:
+            revoke_token(token)
+        except Exception as e:
+            logging.exception(e)
+        finally:
+            revoke_queue.task_done()
+
+
+def enqueue_revoke_token(token: str) -> None:
+    """Queues an OAuth2 token to be revoked in the background.
+
+    The worker threads are started on first use, after the server forks.
+    """
+    with revoke_workers_lock:
+        if not revoke_workers:
+            for i in range(REVOKE_WORKERS):
+                worker = threading.Thread(
+                    target=run_revoke_worker, name=f"revoke-{i}", daemon=True)
+                worker.start()
+                revoke_workers.append(worker)
+    try:
+        revoke_queue.put_nowait(token)
+    except queue.Full:
+        logging.error("Revoke queue is full, token not revoked")
 
 
 def get_user_credentials(user_name: str) -> Credentials:
@@ -99,7 +276,7 @@ def get_config_url(event) -> Any:
 
 
 def logout(user_name: str) -> None:
-    """Remove stored credentials and revoke grant of user."""
+    """Remove stored credentials and queue the revocation of the user grant."""
     store = Store()
     user_credentials = store.get_user_credentials(user_name)
     if user_credentials is None:
@@ -107,11 +284,8 @@ def logout(user_name: str) -> None:
         return
     logging.info("Logging out user %s", user_name)
     store.delete_user_credentials(user_name)
-    requests.post(
-        "https://oauth2.googleapis.com/revoke",
-        params={ "token": user_credentials.token },
-        headers={ "Content-Type": "application/x-www-form-urlencoded" }
-    )
+    # Revoke the grant in the background, so the response doesn't wait for it.
+    enqueue_revoke_token(user_credentials.token)
 
 
 @mod.route("/start")
@@ -149,8 +323,8 @@ def on_oauth2_callback() -> flask.Response:
     creds = oauth2_flow.credentials
 
     # Use the id_token to identify the chat user.
-    request = auth_requests.Request()
-    id_info = id_token.verify_oauth2_token(creds.id_token, request, creds.client_id)
+    id_info = id_token.verify_oauth2_token(
+        creds.id_token, get_auth_request(), creds.client_id)
     if id_info["iss"] != "https://accounts.google.com":
         return flask.abort(403)
 
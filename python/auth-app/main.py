@@ -18,16 +18,29 @@ It runs in Python App Engine and uses Google Cloud Datastorefor storing user cre
 """
 from __future__ import annotations
 
+import functools
+import json
 import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
 import flask
 import auth
+import google_auth_httplib2
+import httplib2
 from google.oauth2.credentials import Credentials
-from googleapiclient import discovery
+from googleapiclient import discovery, discovery_cache, errors
+from profile_cache import ProfileCache
 from werkzeug.middleware.proxy_fix import ProxyFix
 
+# Seconds before a cached profile is revalidated against the People API.
+PROFILE_CACHE_TTL = float(os.environ.get("PROFILE_CACHE_TTL", "3600"))
+
+# Maximum number of users whose profile is kept in memory.
+PROFILE_CACHE_SIZE = int(os.environ.get("PROFILE_CACHE_SIZE", "10000"))
+
 app = flask.Flask(__name__)
 app.register_blueprint(auth.mod, url_prefix="/auth")
 app.wsgi_app = ProxyFix(app.wsgi_app)
@@ -41,6 +54,12 @@ logging.basicConfig(
     format="{levelname:.1}{asctime} {filename}:{lineno}] {message}"
 )
 
+profile_cache = ProfileCache(PROFILE_CACHE_TTL, PROFILE_CACHE_SIZE)
+
+# Refreshes stale profiles after the cached profile is returned.
+profile_refresh_executor = ThreadPoolExecutor(
+    max_workers=4, thread_name_prefix="profile-refresh")
+
 
 @app.route("/", methods=["POST"])
 def on_event() -> Any | dict:
@@ -71,12 +90,13 @@ def on_mention(event: dict) -> dict:
             "url": auth.get_config_url(event)
         }})
     logging.info("Found existing auth credentials for user %s", user_name)
-    return flask.jsonify(produce_profile_message(user_credentials))
+    return flask.jsonify(produce_profile_message(user_name, user_credentials))
 
 
 def on_logout(event) -> dict:
     """Handles logging out the user."""
     user_name = event["user"]["name"]
+    profile_cache.invalidate(user_name)
     try:
         auth.logout(user_name)
     except Exception as e:
@@ -88,17 +108,101 @@ def on_logout(event) -> dict:
         return flask.jsonify({ "text": "Logged out." })
 
 
-def produce_profile_message(creds: Credentials) -> dict:
-    """Generate a message containing the users profile inforamtion."""
-    people_api = discovery.build("people", "v1", credentials=creds)
+@functools.cache
+def get_people_discovery_document() -> dict:
+    """Loads the People API discovery document bundled with the client library.
+
+    The document is parsed once, instead of on every call to discovery.build.
+    """
+    return json.loads(discovery_cache.get_static_doc("people", "v1"))
+
+
+# HTTP connections to Google APIs, kept open across requests. httplib2 is not
+# thread-safe, so each thread has its own connections.
+http_pool = threading.local()
+
+
+def get_http() -> httplib2.Http:
+    """Gets the HTTP connections of the calling thread."""
+    if not hasattr(http_pool, "http"):
+        http_pool.http = httplib2.Http(timeout=30)
+    return http_pool.http
+
+
+def build_people_api(creds: Credentials) -> Any:
+    """Builds a People API client with the user credentials.
+
+    The client uses the cached discovery document and the pooled connections,
+    so fetching the profile only takes the People API call.
+    """
+    return discovery.build_from_document(
+        get_people_discovery_document(),
+        http=google_auth_httplib2.AuthorizedHttp(creds, http=get_http())
+    )
+
+
+def fetch_person(creds: Credentials, etag: str | None = None) -> dict | None:
+    """Fetches the names and photos of the user from the People API.
+
+    If an etag is given, returns None when the profile hasn't changed since.
+    """
+    request = build_people_api(creds).people().get(
+        resourceName="people/me",
+        personFields=",".join(["names", "photos"])
+    )
+    if etag:
+        request.headers["If-None-Match"] = etag
+    try:
+        person = request.execute()
+    except errors.HttpError as e:
+        if e.resp.status == 304:
+            return None
+        raise
+    if etag and person.get("etag") == etag:
+        return None
+    return person
+
+
+def refresh_profile(user_name: str, creds: Credentials, etag: str | None) -> None:
+    """Revalidates the cached profile of a user in the background."""
     try:
-        person = (people_api.people().get(
-            resourceName="people/me",
-            personFields=",".join(["names", "photos"])
-        ).execute())
+        person = fetch_person(creds, etag)
+        if person is None:
+            profile_cache.touch(user_name)
+        else:
+            profile_cache.put(
+                user_name, person.get("etag"), format_profile_message(person))
+    except Exception as e:
+        # Keep serving the cached profile, and retry on the next mention.
+        logging.exception(e)
+    finally:
+        profile_cache.end_refresh(user_name)
+
+
+def produce_profile_message(user_name: str, creds: Credentials) -> dict:
+    """Generate a message containing the users profile inforamtion.
+
+    Cached profiles are returned right away. If they are older than the TTL,
+    they are revalidated in the background.
+    """
+    if cached := profile_cache.get(user_name):
+        if (profile_cache.is_stale(cached)
+                and profile_cache.start_refresh(user_name)):
+            profile_refresh_executor.submit(
+                refresh_profile, user_name, creds, cached.etag)
+        return cached.message
+    try:
+        person = fetch_person(creds)
     except Exception as e:
         logging.exception(e)
         return { "text": "Failed to fetch profile info: ```%s```" % e }
+    message = format_profile_message(person)
+    profile_cache.put(user_name, person.get("etag"), message)
+    return message
+
+
+def format_profile_message(person: dict) -> dict:
+    """Formats the profile of a user as a message."""
     if person.get("names") and person.get("photos"):
         return { "cards": [{ "header": {
             "title": person["names"][0]["displayName"],
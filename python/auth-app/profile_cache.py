@@ -0,0 +1,93 @@
+# Copyright 2025 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""In-memory cache of the profile messages shown to users.
+
+Cached profiles are returned even after their TTL, while the app refreshes them
+in the background, since display names and avatars rarely change.
+"""
+
+from __future__ import annotations
+
+import collections
+import threading
+import time
+from typing import NamedTuple
+
+
+class CachedProfile(NamedTuple):
+    """A profile message and the People API etag it was rendered from."""
+    fetched_at: float
+    etag: str | None
+    message: dict
+
+
+class ProfileCache:
+    """Caches profile messages by user name.
+
+    When full, the least recently used entry is evicted.
+    """
+    def __init__(self, ttl: float, max_size: int) -> ProfileCache:
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = collections.OrderedDict()
+        self.refreshing = set()
+        self.lock = threading.Lock()
+
+    def get(self, user_name: str) -> CachedProfile | None:
+        """Returns the cached profile of a user, even if it's stale."""
+        with self.lock:
+            profile = self.entries.get(user_name)
+            if profile is not None:
+                self.entries.move_to_end(user_name)
+            return profile
+
+    def put(self, user_name: str, etag: str | None, message: dict) -> None:
+        """Caches the profile message of a user."""
+        with self.lock:
+            self.entries[user_name] = CachedProfile(time.monotonic(), etag, message)
+            self.entries.move_to_end(user_name)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def touch(self, user_name: str) -> None:
+        """Marks the cached profile of a user as fresh, after revalidating it."""
+        with self.lock:
+            if profile := self.entries.get(user_name):
+                self.entries[user_name] = profile._replace(fetched_at=time.monotonic())
+
+    def invalidate(self, user_name: str) -> None:
+        """Removes the cached profile of a user."""
+        with self.lock:
+            self.entries.pop(user_name, None)
+
+    def is_stale(self, profile: CachedProfile) -> bool:
+        """Whether a cached profile is older than the TTL."""
+        return profile.fetched_at + self.ttl < time.monotonic()
+
+    def start_refresh(self, user_name: str) -> bool:
+        """Claims the refresh of a user's profile.
+
+        Returns False if the profile is already being refreshed.
+        """
+        with self.lock:
+            if user_name in self.refreshing:
+                return False
+            self.refreshing.add(user_name)
+            return True
+
+    def end_refresh(self, user_name: str) -> None:
+        """Releases the refresh of a user's profile."""
+        with self.lock:
+            self.refreshing.discard(user_name)
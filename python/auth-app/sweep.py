@@ -0,0 +1,139 @@
+# Copyright 2025 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Maintenance job that deletes stale RefreshToken entities from Datastore.
+
+Entities whose timestamp is older than the maximum age are deleted in batches,
+and their tokens are optionally revoked first. Run it against the Datastore
+emulator by setting DATASTORE_EMULATOR_HOST, for example:
+
+    gcloud beta emulators datastore start
+    $(gcloud beta emulators datastore env-init)
+    python sweep.py --max-age-days 90 --dry-run
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from google.cloud.datastore.query import PropertyFilter
+
+import auth
+
+# Maximum number of keys Datastore accepts in a single delete_multi call.
+MAX_BATCH_SIZE = 500
+
+# Number of tokens revoked concurrently.
+REVOKE_CONCURRENCY = 8
+
+
+def grant_token(entity) -> str | None:
+    """Returns the token that revokes the grant of a stored entity.
+
+    Access tokens expire after about an hour, long before an entity is stale,
+    and the revoke endpoint rejects expired tokens. The refresh token is valid
+    until the grant is revoked, so it's revoked instead when there is one.
+    """
+    credentials = entity.get("credentials") or {}
+    return credentials.get("refresh_token") or credentials.get("token")
+
+
+def sweep(max_age_days: float, page_size: int = MAX_BATCH_SIZE,
+          revoke: bool = False, dry_run: bool = False) -> dict:
+    """Deletes RefreshToken entities older than max_age_days.
+
+    With revoke, entities whose token can't be revoked, for example because
+    the revoke endpoint is unreachable, are kept for the next run. Tokens that
+    the endpoint rejects as already invalid are deleted.
+
+    Returns the number of scanned, revoked, kept and deleted entities, and the
+    elapsed seconds.
+    """
+    client = auth.get_datastore_client()
+    cutoff = time.time() - max_age_days * 24 * 60 * 60
+    stats = { "scanned": 0, "revoked": 0, "kept": 0, "deleted": 0 }
+    start = time.perf_counter()
+    cursor = None
+    with ThreadPoolExecutor(max_workers=REVOKE_CONCURRENCY) as executor:
+        while True:
+            query = client.query(kind="RefreshToken")
+            query.add_filter(filter=PropertyFilter("timestamp", "<", cutoff))
+            if not revoke:
+                # Only the keys are needed to delete the entities.
+                query.keys_only()
+            iterator = query.fetch(limit=page_size, start_cursor=cursor)
+            entities = list(next(iterator.pages))
+            if not entities:
+                break
+            stats["scanned"] += len(entities)
+
+            if revoke and not dry_run:
+                # Entities whose token couldn't be revoked are kept, so that
+                # the next run tries again.
+                tokens = list(map(grant_token, entities))
+                revoked = list(executor.map(
+                    lambda token: token is None or auth.revoke_token(token),
+                    tokens))
+                stats["revoked"] += sum(
+                    1 for token, ok in zip(tokens, revoked) if token and ok)
+                stats["kept"] += revoked.count(False)
+                entities = [entity for entity, ok in zip(entities, revoked)
+                            if ok]
+            if not dry_run and entities:
+                client.delete_multi([entity.key for entity in entities])
+                stats["deleted"] += len(entities)
+
+            elapsed = max(time.perf_counter() - start, 1e-9)
+            logging.info("Scanned %d entities, %.1f entities/s",
+                         stats["scanned"], stats["scanned"] / elapsed)
+            cursor = iterator.next_page_token
+            if cursor is None:
+                break
+    stats["elapsed"] = time.perf_counter() - start
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-age-days", type=float, default=180,
+                        help="delete credentials stored longer ago than this")
+    parser.add_argument("--page-size", type=int, default=MAX_BATCH_SIZE,
+                        help=f"entities per query page, up to {MAX_BATCH_SIZE}")
+    parser.add_argument("--revoke", action="store_true",
+                        help="revoke the tokens before deleting them")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="count stale entities without changing them")
+    args = parser.parse_args()
+    if not 0 < args.page_size <= MAX_BATCH_SIZE:
+        parser.error(f"--page-size must be between 1 and {MAX_BATCH_SIZE}")
+
+    stats = sweep(args.max_age_days, args.page_size, args.revoke, args.dry_run)
+    elapsed = max(stats["elapsed"], 1e-9)
+    print(f"Scanned {stats['scanned']}, revoked {stats['revoked']}, "
+          f"kept {stats['kept']}, deleted {stats['deleted']} entities "
+          f"in {stats['elapsed']:.1f}s "
+          f"({stats['scanned'] / elapsed:.1f} entities/s)")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        style="{",
+        format="{levelname:.1}{asctime} {filename}:{lineno}] {message}"
+    )
+    main()
@@ -0,0 +1,243 @@
+# Copyright 2025 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import queue
+import unittest
+from unittest import mock
+
+import requests
+from google.oauth2.credentials import Credentials
+
+# Import the module under test
+import auth
+
+
+def response(status_code, body=None):
+    """Returns a response of the revoke endpoint."""
+    result = requests.Response()
+    result.status_code = status_code
+    if body is not None:
+        result._content = body.encode()
+    return result
+
+
+class FakeDatastore:
+    """Datastore client that keeps entities in a dict and counts reads."""
+
+    def __init__(self):
+        self.entities = {}
+        self.gets = 0
+
+    def key(self, kind, name):
+        return (kind, name)
+
+    def get(self, key):
+        self.gets += 1
+        return self.entities.get(key)
+
+    def put(self, entity):
+        self.entities[entity.key] = dict(entity)
+
+    def delete(self, key):
+        self.entities.pop(key, None)
+
+
+class CredentialsCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch.object(auth.time, "monotonic",
+                                    side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    # Test that cached credentials expire after the TTL
+    def testExpiresAfterTtl(self):
+        cache = auth.CredentialsCache(ttl=60, max_size=10)
+        creds = Credentials("token")
+        cache.put("users/1", creds)
+
+        self.now += 59
+        self.assertIs(cache.get("users/1"), creds)
+        self.now += 2
+        self.assertIsNone(cache.get("users/1"))
+
+    # Test that the least recently used credentials are evicted
+    def testEvictsLeastRecentlyUsed(self):
+        cache = auth.CredentialsCache(ttl=60, max_size=2)
+        cache.put("users/1", Credentials("token1"))
+        cache.put("users/2", Credentials("token2"))
+        cache.get("users/1")
+        cache.put("users/3", Credentials("token3"))
+
+        self.assertIsNotNone(cache.get("users/1"))
+        self.assertIsNone(cache.get("users/2"))
+        self.assertIsNotNone(cache.get("users/3"))
+
+
+class StoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.datastore = FakeDatastore()
+        for patcher in [
+            mock.patch.object(auth, "get_datastore_client",
+                              return_value=self.datastore),
+            mock.patch.object(auth, "credentials_cache",
+                              auth.CredentialsCache(ttl=60, max_size=10)),
+            mock.patch.object(auth, "enqueue_revoke_token"),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.store = auth.Store()
+
+    def credentials(self, token):
+        return Credentials(token, refresh_token="refresh", client_id="id",
+                           client_secret="secret",
+                           token_uri="https://oauth2.googleapis.com/token")
+
+    # Test that stored credentials are read from Datastore once
+    def testCachesCredentials(self):
+        self.store.put_user_credentials("users/1", self.credentials("token"))
+
+        self.assertEqual(self.store.get_user_credentials("users/1").token, "token")
+        self.assertEqual(self.store.get_user_credentials("users/1").token, "token")
+        self.assertEqual(self.datastore.gets, 1)
+
+    # Test that storing new credentials invalidates the cached ones
+    def testPutInvalidatesCache(self):
+        self.store.put_user_credentials("users/1", self.credentials("token1"))
+        self.store.get_user_credentials("users/1")
+        self.store.put_user_credentials("users/1", self.credentials("token2"))
+
+        self.assertEqual(self.store.get_user_credentials("users/1").token, "token2")
+
+    # Test that logging out invalidates the cached credentials
+    def testLogoutInvalidatesCache(self):
+        self.store.put_user_credentials("users/1", self.credentials("token"))
+        self.store.get_user_credentials("users/1")
+
+        auth.logout("users/1")
+
+        self.assertIsNone(self.store.get_user_credentials("users/1"))
+        auth.enqueue_revoke_token.assert_called_once_with("token")
+
+
+class RevokeTokenTest(unittest.TestCase):
+
+    def setUp(self):
+        self.session = mock.Mock()
+        for patcher in [
+            mock.patch.object(auth, "get_http_session",
+                              return_value=self.session),
+            mock.patch.object(auth.time, "sleep"),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    # Test that a revoked token is reported as revoked
+    def testRevoked(self):
+        self.session.post.return_value = response(200)
+
+        self.assertTrue(auth.revoke_token("token"))
+
+    # Test that a token that was already invalid is reported as revoked
+    def testAlreadyInvalid(self):
+        self.session.post.return_value = response(
+            400, '{"error": "invalid_token"}')
+
+        self.assertTrue(auth.revoke_token("token"))
+
+    # Test that other client errors aren't retried
+    def testRejected(self):
+        self.session.post.return_value = response(
+            400, '{"error": "invalid_request"}')
+
+        self.assertFalse(auth.revoke_token("token"))
+        self.assertEqual(self.session.post.call_count, 1)
+
+    # Test that server and network errors are retried
+    def testRetriesServerErrors(self):
+        self.session.post.side_effect = [
+            response(503), requests.ConnectionError(), response(200)]
+
+        self.assertTrue(auth.revoke_token("token"))
+        self.assertEqual(self.session.post.call_count, 3)
+
+    # Test that the revoke fails once every attempt failed
+    def testGivesUp(self):
+        self.session.post.return_value = response(503)
+
+        self.assertFalse(auth.revoke_token("token"))
+        self.assertEqual(self.session.post.call_count, auth.REVOKE_MAX_ATTEMPTS)
+
+
+class RevokeQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.session = mock.Mock()
+        self.session.post.return_value = response(200)
+        for patcher in [
+            mock.patch.object(auth, "get_http_session",
+                              return_value=self.session),
+            mock.patch.object(auth.time, "sleep"),
+            mock.patch.object(auth, "revoke_queue", queue.Queue(maxsize=2)),
+            mock.patch.object(auth, "revoke_workers", []),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def revoked_tokens(self):
+        return [call.kwargs["params"]["token"]
+                for call in self.session.post.call_args_list]
+
+    # Test that the workers revoke every queued token
+    def testDrainsQueue(self):
+        auth.enqueue_revoke_token("token1")
+        auth.enqueue_revoke_token("token2")
+        auth.revoke_queue.join()
+
+        self.assertCountEqual(self.revoked_tokens(), ["token1", "token2"])
+        self.assertEqual(len(auth.revoke_workers), auth.REVOKE_WORKERS)
+
+    # Test that the workers retry server errors
+    def testRetriesServerErrors(self):
+        self.session.post.side_effect = [response(503), response(200)]
+
+        auth.enqueue_revoke_token("token")
+        auth.revoke_queue.join()
+
+        self.assertEqual(self.revoked_tokens(), ["token", "token"])
+
+    # Test that the workers keep revoking tokens after an unexpected error
+    def testSurvivesErrors(self):
+        self.session.post.side_effect = [ValueError("unexpected"), response(200)]
+
+        with self.assertLogs(level="ERROR"):
+            auth.enqueue_revoke_token("token1")
+            auth.revoke_queue.join()
+        auth.enqueue_revoke_token("token2")
+        auth.revoke_queue.join()
+
+        self.assertEqual(self.revoked_tokens(), ["token1", "token2"])
+
+    # Test that tokens are dropped with an error when the queue is full
+    def testFullQueue(self):
+        # Without workers, nothing is taken from the queue.
+        auth.revoke_workers.append(None)
+        auth.enqueue_revoke_token("token1")
+        auth.enqueue_revoke_token("token2")
+
+        with self.assertLogs(level="ERROR"):
+            auth.enqueue_revoke_token("token3")
+        self.assertEqual(auth.revoke_queue.qsize(), 2)
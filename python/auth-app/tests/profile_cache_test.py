@@ -0,0 +1,128 @@
+# Copyright 2025 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from unittest import mock
+
+# Import the modules under test
+import main
+import profile_cache
+from profile_cache import ProfileCache
+
+PERSON = {
+    "etag": "etag1",
+    "names": [{ "displayName": "Alice" }],
+    "photos": [{ "url": "https://example.com/alice.png" }],
+}
+
+
+class ProfileCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch.object(profile_cache.time, "monotonic",
+                                    side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = ProfileCache(ttl=60, max_size=2)
+
+    # Test that profiles become stale after the TTL, and fresh once touched
+    def testStaleAfterTtl(self):
+        self.cache.put("users/1", "etag", { "text": "profile" })
+
+        self.now += 59
+        self.assertFalse(self.cache.is_stale(self.cache.get("users/1")))
+        self.now += 2
+        self.assertTrue(self.cache.is_stale(self.cache.get("users/1")))
+        self.cache.touch("users/1")
+        self.assertFalse(self.cache.is_stale(self.cache.get("users/1")))
+
+    # Test that the least recently used profile is evicted
+    def testEvictsLeastRecentlyUsed(self):
+        self.cache.put("users/1", None, {})
+        self.cache.put("users/2", None, {})
+        self.cache.get("users/1")
+        self.cache.put("users/3", None, {})
+
+        self.assertIsNotNone(self.cache.get("users/1"))
+        self.assertIsNone(self.cache.get("users/2"))
+
+    # Test that a profile is refreshed by one caller at a time
+    def testRefreshIsClaimedOnce(self):
+        self.assertTrue(self.cache.start_refresh("users/1"))
+        self.assertFalse(self.cache.start_refresh("users/1"))
+        self.cache.end_refresh("users/1")
+        self.assertTrue(self.cache.start_refresh("users/1"))
+
+
+class ProduceProfileMessageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ProfileCache(ttl=60, max_size=10)
+        self.fetch_person = mock.Mock(return_value=PERSON)
+        self.executor = mock.Mock()
+        # Run the background refreshes right away.
+        self.executor.submit.side_effect = lambda f, *args: f(*args)
+        for patcher in [
+            mock.patch.object(main, "profile_cache", self.cache),
+            mock.patch.object(main, "fetch_person", self.fetch_person),
+            mock.patch.object(main, "profile_refresh_executor", self.executor),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def makeStale(self):
+        profile = self.cache.get("users/1")
+        self.cache.entries["users/1"] = profile._replace(
+            fetched_at=profile.fetched_at - 61)
+
+    # Test that a cached profile is returned without fetching it again
+    def testReturnsCachedProfile(self):
+        message = main.produce_profile_message("users/1", None)
+
+        self.assertEqual(main.produce_profile_message("users/1", None), message)
+        self.fetch_person.assert_called_once_with(None)
+        self.executor.submit.assert_not_called()
+
+    # Test that a stale profile is revalidated with its etag in the background
+    def testRevalidatesStaleProfile(self):
+        main.produce_profile_message("users/1", None)
+        self.makeStale()
+        self.fetch_person.return_value = None
+
+        main.produce_profile_message("users/1", None)
+
+        self.fetch_person.assert_called_with(None, "etag1")
+        self.assertFalse(self.cache.is_stale(self.cache.get("users/1")))
+
+    # Test that the stale profile is still served when the refresh fails
+    def testKeepsProfileWhenRefreshFails(self):
+        message = main.produce_profile_message("users/1", None)
+        self.makeStale()
+        self.fetch_person.side_effect = RuntimeError("People API unavailable")
+
+        with self.assertLogs(level="ERROR"):
+            self.assertEqual(
+                main.produce_profile_message("users/1", None), message)
+        self.assertTrue(self.cache.start_refresh("users/1"))
+
+    # Test that logging out removes the cached profile
+    def testLogoutInvalidatesProfile(self):
+        main.produce_profile_message("users/1", None)
+
+        with mock.patch.object(main.auth, "logout"), \
+                main.app.test_request_context():
+            main.on_logout({ "user": { "name": "users/1" } })
+
+        self.assertIsNone(self.cache.get("users/1"))
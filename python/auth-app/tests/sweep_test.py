@@ -0,0 +1,119 @@
+# Copyright 2025 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from unittest import mock
+
+# Import the module under test
+import sweep
+
+
+class FakeEntity(dict):
+    """A Datastore entity with a key."""
+
+    def __init__(self, name, credentials):
+        super().__init__(credentials=credentials, timestamp=0)
+        self.key = name
+
+
+class FakeQuery:
+    """Returns the entities in pages ordered by key, with the last key of a
+    page as the cursor of the next one."""
+
+    def __init__(self, entities):
+        self.entities = sorted(entities, key=lambda entity: entity.key)
+
+    def add_filter(self, filter):
+        pass
+
+    def keys_only(self):
+        pass
+
+    def fetch(self, limit, start_cursor):
+        page = [entity for entity in self.entities
+                if start_cursor is None or entity.key > start_cursor][:limit]
+        more = len(page) == limit and page[-1] is not self.entities[-1]
+        return mock.Mock(pages=iter([page]),
+                         next_page_token=page[-1].key if more else None)
+
+
+class FakeClient:
+    """Datastore client with RefreshToken entities."""
+
+    def __init__(self, entities):
+        self.entities = entities
+        self.deleted = []
+
+    def query(self, kind):
+        return FakeQuery(self.entities)
+
+    def delete_multi(self, keys):
+        self.deleted.extend(keys)
+        self.entities = [e for e in self.entities if e.key not in keys]
+
+
+class SweepTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeClient([
+            FakeEntity("users/1", {"token": "access1",
+                                   "refresh_token": "refresh1"}),
+            FakeEntity("users/2", {"token": "access2", "refresh_token": None}),
+            FakeEntity("users/3", {}),
+        ])
+        patcher = mock.patch.object(sweep.auth, "get_datastore_client",
+                                    return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(sweep.auth, "revoke_token",
+                                    return_value=True)
+        self.revoke_token = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    # Test that the refresh token is revoked, or the access token without one
+    def testRevokesRefreshTokens(self):
+        stats = sweep.sweep(max_age_days=90, revoke=True)
+
+        revoked = sorted(call.args[0] for call in self.revoke_token.call_args_list)
+        self.assertEqual(revoked, ["access2", "refresh1"])
+        self.assertEqual(stats["revoked"], 2)
+        self.assertEqual(stats["deleted"], 3)
+
+    # Test that a dry run neither revokes nor deletes
+    def testDryRun(self):
+        stats = sweep.sweep(max_age_days=90, revoke=True, dry_run=True)
+
+        self.revoke_token.assert_not_called()
+        self.assertEqual(self.client.deleted, [])
+        self.assertEqual(stats["scanned"], 3)
+
+    # Test that every page of entities is swept
+    def testSweepsEveryPage(self):
+        stats = sweep.sweep(max_age_days=90, page_size=2, revoke=True)
+
+        self.assertEqual(stats["scanned"], 3)
+        self.assertEqual(sorted(self.client.deleted),
+                         ["users/1", "users/2", "users/3"])
+
+    # Test that entities whose token can't be revoked are kept for the next run
+    def testKeepsEntitiesWhenRevokeFails(self):
+        self.revoke_token.side_effect = lambda token: token != "refresh1"
+
+        stats = sweep.sweep(max_age_days=90, revoke=True)
+
+        self.assertEqual(stats["revoked"], 1)
+        self.assertEqual(stats["kept"], 1)
+        self.assertEqual(stats["deleted"], 2)
+        self.assertEqual(sorted(self.client.deleted), ["users/2", "users/3"])
+        self.assertEqual([e.key for e in self.client.entities], ["users/1"])
@@ -17,9 +17,13 @@
 Simple Google Chat app that responds to events and
 messages from a space.
 """
+import hashlib
 import logging
+import threading
+import time
 from flask import Flask, render_template, request, json
 from google.oauth2 import id_token
+from google.auth import jwt
 from google.auth.transport import requests
 
 # Authentication audience (either APP_URL or PROJECT_NUMBER)
@@ -30,8 +34,59 @@ AUDIENCE_TYPE = "AUDIENCE_TYPE"
 # - The project number when AUDIENCE_TYPE is set to PROJECT_NUMBER
 AUDIENCE = "AUDIENCE"
 
+# Maximum number of verified tokens remembered. Google Chat sends the same token
+# with every event until it expires, so only a few are valid at any time.
+MAX_VERIFIED_TOKENS = 1000
+
 app = Flask(__name__)
 
+
+class VerifiedTokens:
+    """Remembers verified bearer tokens until they expire, so that the events
+    sent with the same token are verified only once.
+
+    Tokens are stored by their SHA-256 hash, with the expiration time of their
+    exp claim.
+    """
+
+    def __init__(self, max_size=MAX_VERIFIED_TOKENS):
+        self.max_size = max_size
+        self.expirations = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(bearer):
+        return hashlib.sha256(bearer.encode()).digest()
+
+    def contains(self, bearer):
+        """Returns whether the token was verified and hasn't expired."""
+        key = self.key(bearer)
+        with self.lock:
+            expiration = self.expirations.get(key)
+            if expiration is None:
+                return False
+            if expiration <= time.time():
+                del self.expirations[key]
+                return False
+            return True
+
+    def add(self, bearer, expiration):
+        """Remembers a verified token until its expiration time."""
+        now = time.time()
+        with self.lock:
+            if len(self.expirations) >= self.max_size:
+                # Drop expired tokens, then the oldest ones.
+                self.expirations = {
+                    key: value for key, value in self.expirations.items()
+                    if value > now
+                }
+                while len(self.expirations) >= self.max_size:
+                    del self.expirations[next(iter(self.expirations))]
+            self.expirations[self.key(bearer)] = expiration
+
+
+verified_tokens = VerifiedTokens()
+
 @app.route('/', methods=['POST'])
 def home_post():
     """Respond to POST requests to this endpoint.
@@ -54,8 +109,8 @@ def format_response(event):
 
     text = ""
 
-    authorization = request.headers.get('Authorization')
-    if verify_chat_app_request(authorization[len("Bearer "):]) != True:
+    authorization = request.headers.get('Authorization', '')
+    if verify_chat_app_request_cached(authorization[len("Bearer "):]) != True:
         text = 'Failed verification!'
 
     # Case 1: The app was added to a space
@@ -74,6 +129,28 @@ def format_response(event):
 
     return {'text': text}
 
+def verify_chat_app_request_cached(bearer):
+    """Determine whether a Google Chat request is legitimate, verifying every
+    bearer token only once until it expires.
+
+    Args:
+      bearer: The bearer value sent in the request.
+    """
+    if verified_tokens.contains(bearer):
+        return True
+    if verify_chat_app_request(bearer) != True:
+        return False
+
+    try:
+        # The token was verified, so its claims can be read without verifying
+        # it again.
+        expiration = jwt.decode(bearer, verify=False)['exp']
+    except (ValueError, KeyError):
+        # Not a token, for example because verification is disabled.
+        return True
+    verified_tokens.add(bearer, expiration)
+    return True
+
 def verify_chat_app_request(bearer):
     """Determine whether a Google Chat request is legitimate.
 
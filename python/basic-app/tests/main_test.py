@@ -12,12 +12,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import base64
 import unittest
 import json
 import sys
+import time
+from unittest import mock
 
 # Import the module under test
-import app
+import main as app
 
 class AppTest(unittest.TestCase):
     ROOM_DISPLAY_NAME = 'App Testing'
@@ -103,3 +106,91 @@ class AppTest(unittest.TestCase):
         self.assertEqual(data['text'], 'Your message: "%s"'
             % message_text)
         self.assertEqual(response.content_type, 'application/json')
+
+
+class VerifiedTokensTest(unittest.TestCase):
+    CHAT_ISSUER = 'chat@system.gserviceaccount.com'
+
+    def setUp(self):
+        self.app = app.app.test_client()
+        patches = [
+            mock.patch.object(app, 'verified_tokens', app.VerifiedTokens()),
+            mock.patch.object(app, 'AUDIENCE_TYPE', 'APP_URL'),
+            mock.patch.object(app.id_token, 'verify_oauth2_token'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.verify_oauth2_token = app.id_token.verify_oauth2_token
+        self.verify_oauth2_token.return_value = {'email': self.CHAT_ISSUER}
+
+    def token(self, name, expiration=None):
+        """Returns an unsigned JWT, since verification is mocked."""
+        if expiration is None:
+            expiration = time.time() + 3600
+        claims = {'sub': name, 'exp': int(expiration)}
+        return b'.'.join([
+            base64.urlsafe_b64encode(json.dumps(part).encode()).rstrip(b'=')
+            for part in ({'alg': 'RS256'}, claims)] + [b'c2lnbmF0dXJl']).decode()
+
+    def post(self, token):
+        message = {
+            'type': 'MESSAGE',
+            'message': {
+                'text': 'Hello'
+            }
+        }
+
+        response = self.app.post('/',
+            data=json.dumps(message),
+            content_type='application/json',
+            headers={'Authorization': 'Bearer ' + token})
+
+        return json.loads(response.data)['text']
+
+    # Test that a repeated token is verified only once
+    def testRepeatedTokenIsVerifiedOnce(self):
+        token = self.token('a')
+
+        self.assertEqual(self.post(token), 'Your message: "Hello"')
+        self.assertEqual(self.post(token), 'Your message: "Hello"')
+
+        self.assertEqual(self.verify_oauth2_token.call_count, 1)
+
+    # Test that a different token is verified again
+    def testOtherTokenIsVerified(self):
+        self.post(self.token('a'))
+        self.post(self.token('b'))
+
+        self.assertEqual(self.verify_oauth2_token.call_count, 2)
+
+    # Test that an expired token is verified again
+    def testExpiredTokenIsVerifiedAgain(self):
+        token = self.token('a', expiration=time.time() - 1)
+
+        self.post(token)
+        self.post(token)
+
+        self.assertEqual(self.verify_oauth2_token.call_count, 2)
+
+    # Test that a token that fails verification isn't remembered
+    def testFailedTokenIsNotRemembered(self):
+        self.verify_oauth2_token.side_effect = ValueError('Invalid token')
+        token = self.token('a')
+
+        self.assertEqual(self.post(token), 'Failed verification!')
+        self.assertEqual(self.post(token), 'Failed verification!')
+
+        self.assertEqual(self.verify_oauth2_token.call_count, 2)
+
+    # Test that the oldest tokens are forgotten when the cache is full
+    def testOldestTokenIsForgotten(self):
+        tokens = app.VerifiedTokens(max_size=2)
+        expiration = time.time() + 3600
+
+        for token in ('token1', 'token2', 'token3'):
+            tokens.add(token, expiration)
+
+        self.assertFalse(tokens.contains('token1'))
+        self.assertTrue(tokens.contains('token2'))
+        self.assertTrue(tokens.contains('token3'))
@@ -0,0 +1,173 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Events sent by Google Chat to the HTTP endpoint of the sample apps, for load
+tests and benchmarks.
+"""
+
+# Headers sent with every event. The bearer token is only verified by the apps
+# configured to verify requests.
+HEADERS = {
+    'Authorization': 'Bearer benchmark-token',
+    'Content-Type': 'application/json',
+}
+
+USER = {
+    'name': 'users/123456789',
+    'displayName': 'Chuck Norris',
+    'avatarUrl': 'https://lh3.googleusercontent.com/a/default-user',
+    'email': 'chuck@example.com',
+    'type': 'HUMAN',
+    'domainId': 'example',
+}
+
+SPACE = {
+    'name': 'spaces/AAAAAAAAAAA',
+    'type': 'ROOM',
+    'displayName': 'Benchmark space',
+    'spaceThreadingState': 'THREADED_MESSAGES',
+    'spaceType': 'SPACE',
+}
+
+
+def message_event(text, **fields):
+  """Returns a MESSAGE event with a message that has the given fields."""
+  message = {
+      'name': 'spaces/AAAAAAAAAAA/messages/BBBBBBBBBBB',
+      'sender': USER,
+      'createTime': '2025-01-01T12:00:00.000000Z',
+      'text': text,
+      'argumentText': text,
+      'thread': {'name': 'spaces/AAAAAAAAAAA/threads/CCCCCCCCCCC'},
+      'space': SPACE,
+  }
+  message.update(fields)
+  return {
+      'type': 'MESSAGE',
+      'eventTime': '2025-01-01T12:00:00.000000Z',
+      'message': message,
+      'user': USER,
+      'space': SPACE,
+  }
+
+
+def card_clicked_event(action=None, common=None, **fields):
+  """Returns a CARD_CLICKED event on a message sent by the app."""
+  event = message_event('Hello!', **fields)
+  event['type'] = 'CARD_CLICKED'
+  event['message']['sender'] = {'name': 'users/app', 'type': 'BOT'}
+  if action is not None:
+    event['action'] = action
+  if common is not None:
+    event['common'] = common
+  return event
+
+
+def added_to_space_event():
+  """Returns an ADDED_TO_SPACE event for a space."""
+  return {
+      'type': 'ADDED_TO_SPACE',
+      'eventTime': '2025-01-01T12:00:00.000000Z',
+      'user': USER,
+      'space': SPACE,
+  }
+
+
+def removed_from_space_event():
+  """Returns a REMOVED_FROM_SPACE event for a space."""
+  return dict(added_to_space_event(), type='REMOVED_FROM_SPACE')
+
+
+# Form inputs of the contact form of contact-form-app.
+CONTACT_FORM_INPUTS = {
+    'contactName': {'stringInputs': {'value': ['Jane Doe']}},
+    'contactBirthdate': {'dateInput': {'msSinceEpoch': '946684800000'}},
+    'contactType': {'stringInputs': {'value': ['Personal']}},
+}
+
+# Events by app directory and event name. The first event of every app is the
+# one sent by the load test.
+EVENTS = {
+    'basic-app': {
+        'MESSAGE': message_event('Hello!'),
+        'ADDED_TO_SPACE': added_to_space_event(),
+        'REMOVED_FROM_SPACE': removed_from_space_event(),
+    },
+    'vote-app': {
+        'MESSAGE': message_event('I like benchmarks'),
+        'ADDED_TO_SPACE': added_to_space_event(),
+        'CARD_CLICKED upvote': card_clicked_event(action={
+            'actionMethodName': 'upvote',
+            'parameters': [
+                {'key': 'voteId', 'value': 'vote1'},
+                {'key': 'statement', 'value': 'I like benchmarks'},
+                {'key': 'count', 'value': '41'},
+            ],
+        }),
+        'CARD_CLICKED newvote': card_clicked_event(
+            action={'actionMethodName': 'newvote'}),
+    },
+    'preview-link': {
+        'MESSAGE support link': message_event(
+            'https://support.example.com/cases/case123',
+            matchedUrl={'url': 'https://support.example.com/cases/case123'}),
+        'MESSAGE text link': message_event(
+            'https://text.example.com/page',
+            matchedUrl={'url': 'https://text.example.com/page'}),
+        'CARD_CLICKED assign': card_clicked_event(
+            action={'actionMethodName': 'assign'}),
+    },
+    'contact-form-app': {
+        'MESSAGE': message_event('Hello!'),
+        'MESSAGE /about': message_event(
+            '/about', slashCommand={'commandId': '1'}),
+        'MESSAGE /addContact': message_event(
+            '/addContact', slashCommand={'commandId': '2'}),
+        'CARD_CLICKED openConfirmation': card_clicked_event(
+            common={'invokedFunction': 'openConfirmation',
+                    'formInputs': CONTACT_FORM_INPUTS},
+            isDialogEvent=True),
+        'CARD_CLICKED submitForm': card_clicked_event(
+            common={'invokedFunction': 'submitForm',
+                    'parameters': {'contactName': 'Jane Doe',
+                                   'contactBirthdate': '946684800000',
+                                   'contactType': 'Personal'}},
+            dialogEventType='SUBMIT_DIALOG'),
+    },
+    'selection-input': {
+        'MESSAGE': message_event('Hello!'),
+        'WIDGET_UPDATE': dict(
+            message_event('Hello!'), type='WIDGET_UPDATE',
+            common={'invokedFunction': 'getContacts',
+                    'parameters': {'autocomplete_widget_query': 'Contact'}}),
+    },
+    'app-home': {
+        'APP_HOME': {
+            'chat': {'type': 'APP_HOME', 'user': USER},
+            'commonEventObject': {'hostApp': 'CHAT', 'platform': 'WEB'},
+        },
+        'SUBMIT_FORM': {
+            'chat': {'type': 'SUBMIT_FORM', 'user': USER},
+            'commonEventObject': {'hostApp': 'CHAT', 'platform': 'WEB',
+                                  'invokedFunction': 'update_app_home'},
+        },
+    },
+    'avatar-app': {
+        'MESSAGE': message_event('Hello!'),
+        'APP_COMMAND /about': dict(
+            message_event('/about'), type='APP_COMMAND',
+            appCommandMetadata={'appCommandId': 1,
+                                'appCommandType': 'SLASH_COMMAND'}),
+    },
+}
@@ -0,0 +1,146 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measures the latency and memory allocations of the POST handler of the sample
+apps for every event in fixtures.py, through the Flask test client.
+
+Usage:
+  python handler_benchmark.py [APP ...] [--requests N]
+      [--output results.json] [--baseline results.json]
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from fixtures import EVENTS, HEADERS
+
+# Directory that contains the sample apps.
+APPS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_app(app):
+  """Returns the Flask app of a sample app."""
+  path = os.path.join(APPS_DIR, app, 'main.py')
+  if app == 'avatar-app':
+    # The Cloud Functions sample is served by the Functions Framework.
+    import functions_framework
+    return functions_framework.create_app(target='avatar_app', source=path)
+  spec = importlib.util.spec_from_file_location(
+      app.replace('-', '_') + '_main', path)
+  module = importlib.util.module_from_spec(spec)
+  # The app imports the other modules in its directory.
+  sys.path.insert(0, os.path.dirname(path))
+  try:
+    spec.loader.exec_module(module)
+  finally:
+    sys.path.remove(os.path.dirname(path))
+  return module.app
+
+
+def measure(client, event, requests):
+  """Returns the latencies in microseconds, and the peak and retained bytes
+  allocated per request."""
+  body = json.dumps(event)
+
+  def post():
+    response = client.post('/', data=body, headers=HEADERS)
+    if response.status_code != 200:
+      raise RuntimeError(f'Status {response.status_code}: {response.data!r}')
+
+  # Warm up the caches of Flask and the app.
+  for _ in range(min(requests, 100)):
+    post()
+
+  latencies = []
+  for _ in range(requests):
+    start = time.perf_counter()
+    post()
+    latencies.append((time.perf_counter() - start) * 1e6)
+
+  # Allocations are measured separately, since tracing slows every request.
+  allocations = min(requests, 100)
+  peaks = []
+  tracemalloc.start()
+  try:
+    before, _ = tracemalloc.get_traced_memory()
+    for _ in range(allocations):
+      current, _ = tracemalloc.get_traced_memory()
+      tracemalloc.reset_peak()
+      post()
+      peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    after, _ = tracemalloc.get_traced_memory()
+  finally:
+    tracemalloc.stop()
+  return latencies, statistics.mean(peaks), (after - before) / allocations
+
+
+def summarize(latencies, peak, retained):
+  """Returns the statistics of an event."""
+  percentiles = statistics.quantiles(latencies, n=100)
+  return {
+      'p50_us': percentiles[49],
+      'p90_us': percentiles[89],
+      'p99_us': percentiles[98],
+      'peak_bytes': peak,
+      'retained_bytes': retained,
+  }
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('apps', nargs='*', metavar='APP',
+                      help='apps to measure, all by default')
+  parser.add_argument('--requests', type=int, default=2000)
+  parser.add_argument('--output', help='file to write the results to')
+  parser.add_argument('--baseline', help='results to compare with')
+  args = parser.parse_args()
+  for app in args.apps:
+    if app not in EVENTS:
+      parser.error(f'unknown app {app}, choose from {", ".join(sorted(EVENTS))}')
+
+  baseline = {}
+  if args.baseline:
+    with open(args.baseline) as f:
+      baseline = json.load(f)
+
+  results = {}
+  for app in args.apps or sorted(EVENTS):
+    client = load_app(app).test_client()
+    for name, event in EVENTS[app].items():
+      key = f'{app} {name}'
+      results[key] = summarize(*measure(client, event, args.requests))
+      result = results[key]
+      line = (f'{key}: p50 {result["p50_us"]:.0f} us, '
+              f'p90 {result["p90_us"]:.0f} us, '
+              f'p99 {result["p99_us"]:.0f} us, '
+              f'peak {result["peak_bytes"] / 1024:.1f} KiB, '
+              f'retained {result["retained_bytes"]:.0f} B per request')
+      if key in baseline:
+        line += (f' (p50 {result["p50_us"] / baseline[key]["p50_us"]:.2f}x, '
+                 f'peak {result["peak_bytes"] / baseline[key]["peak_bytes"]:.2f}x'
+                 ' of baseline)')
+      print(line)
+
+  if args.output:
+    with open(args.output, 'w') as f:
+      json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,82 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measures how many bytes of responses per second a single core can serialize,
+comparing the default JSON provider of Flask with the JSON provider of the
+apps.
+
+Usage:
+  python json_benchmark.py [APP ...] [--responses N]
+"""
+
+import argparse
+import json
+import time
+from flask.json.provider import DefaultJSONProvider
+from fixtures import EVENTS, HEADERS
+from handler_benchmark import load_app
+
+# Apps that serialize their responses with a fast JSON provider.
+APPS = ['contact-form-app', 'preview-link']
+
+
+def record_bodies(flask_app, events):
+  """Returns the response bodies of the app to the events."""
+  bodies = {}
+  response = flask_app.json.response
+  client = flask_app.test_client()
+  for name, event in events.items():
+    def record(*args, **kwargs):
+      bodies[name] = args[0]
+      return response(*args, **kwargs)
+    flask_app.json.response = record
+    client.post('/', data=json.dumps(event), headers=HEADERS)
+  del flask_app.json.response
+  return bodies
+
+
+def measure(provider, body, responses):
+  """Returns the bytes serialized per CPU second."""
+  size = len(provider.response(body).get_data())
+  start = time.process_time()
+  for _ in range(responses):
+    provider.response(body)
+  return size * responses / (time.process_time() - start)
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('apps', nargs='*', metavar='APP',
+                      help='apps to measure, all by default')
+  parser.add_argument('--responses', type=int, default=20000)
+  args = parser.parse_args()
+  for app in args.apps:
+    if app not in APPS:
+      parser.error(f'unknown app {app}, choose from {", ".join(APPS)}')
+
+  for app in args.apps or APPS:
+    flask_app = load_app(app)
+    fast = flask_app.json
+    default = DefaultJSONProvider(flask_app)
+    default.compact = True
+    for name, body in record_bodies(flask_app, EVENTS[app]).items():
+      for provider_name, provider in [('flask default', default),
+                                      ('fast', fast)]:
+        rate = measure(provider, body, args.responses)
+        print(f'{app} {name}, {provider_name}: '
+              f'{rate / 1e6:,.1f} MB/s per core')
+
+
+if __name__ == '__main__':
+  main()
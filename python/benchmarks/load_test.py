@@ -0,0 +1,148 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Load test that compares the requests per second served by a sample app under
+the default App Engine entrypoint, which runs a single sync gunicorn worker,
+and under the gunicorn.conf.py of the app.
+
+Usage:
+  python load_test.py APP [--clients N] [--duration SECONDS]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from fixtures import EVENTS, HEADERS
+
+# Directory that contains the sample apps.
+APPS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Gunicorn command line of every server configuration.
+SERVERS = {
+    # Entrypoint that App Engine runs when app.yaml doesn't set one.
+    'default': ['-b', ':{port}', 'main:app'],
+    'tuned': ['-c', 'gunicorn.conf.py', 'main:app'],
+}
+
+
+def free_port():
+  """Returns a local port that no server listens on."""
+  with socket.socket() as sock:
+    sock.bind(('127.0.0.1', 0))
+    return sock.getsockname()[1]
+
+
+def start_server(app, server, port):
+  """Starts gunicorn in the directory of the app, and waits until it accepts
+  connections."""
+  args = [arg.format(port=port) for arg in SERVERS[server]]
+  process = subprocess.Popen(
+      [sys.executable, '-m', 'gunicorn'] + args,
+      cwd=os.path.join(APPS_DIR, app),
+      env=dict(os.environ, PORT=str(port)),
+      stderr=subprocess.DEVNULL)
+  deadline = time.monotonic() + 30
+  while time.monotonic() < deadline:
+    if process.poll() is not None:
+      raise RuntimeError(f'gunicorn exited with code {process.returncode}')
+    try:
+      socket.create_connection(('127.0.0.1', port), timeout=1).close()
+      return process
+    except OSError:
+      time.sleep(0.1)
+  process.kill()
+  raise RuntimeError('gunicorn did not start in time')
+
+
+def run_client(port, body, deadline, latencies, errors):
+  """Posts the event over a keep-alive connection until the deadline, and
+  reconnects whenever the server closes the connection."""
+  connection = None
+  while time.monotonic() < deadline:
+    if connection is None:
+      connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    start = time.perf_counter()
+    try:
+      connection.request('POST', '/', body, HEADERS)
+      response = connection.getresponse()
+      response.read()
+    except (OSError, http.client.HTTPException):
+      errors.append(1)
+      connection.close()
+      connection = None
+      continue
+    latencies.append(time.perf_counter() - start)
+    if response.status != 200:
+      errors.append(1)
+    if response.will_close:
+      connection.close()
+      connection = None
+  if connection is not None:
+    connection.close()
+
+
+def load_test(app, server, event, clients, duration):
+  """Returns the requests per second, latencies and errors of a server."""
+  port = free_port()
+  process = start_server(app, server, port)
+  try:
+    body = json.dumps(event)
+    latencies = []
+    errors = []
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=run_client,
+                         args=(port, body, deadline, latencies, errors))
+        for _ in range(clients)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    return len(latencies) / duration, latencies, len(errors)
+  finally:
+    process.terminate()
+    process.wait()
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('app', choices=sorted(
+      app for app in EVENTS
+      if os.path.exists(os.path.join(APPS_DIR, app, 'gunicorn.conf.py'))))
+  parser.add_argument('--clients', type=int, default=50)
+  parser.add_argument('--duration', type=float, default=10)
+  args = parser.parse_args()
+
+  event = next(iter(EVENTS[args.app].values()))
+  for server in SERVERS:
+    rate, latencies, errors = load_test(
+        args.app, server, event, args.clients, args.duration)
+    if len(latencies) < 2:
+      print(f'{server}: no responses, {errors} errors')
+      continue
+    percentiles = statistics.quantiles(latencies, n=100)
+    print(f'{server}: {rate:,.0f} requests/s, '
+          f'p50 {percentiles[49] * 1000:.1f} ms, '
+          f'p99 {percentiles[98] * 1000:.1f} ms, {errors} errors')
+
+
+if __name__ == '__main__':
+  main()
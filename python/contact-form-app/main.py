@@ -16,8 +16,10 @@ Google Chat app with card interactions in Python App Engine
 from typing import Any, Mapping
 from datetime import datetime
 from flask import Flask, request, json
+from json_provider import FastJSONProvider
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 
 @app.route('/', methods=['POST'])
 def post() -> Mapping[str, Any]:
@@ -0,0 +1,39 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Gunicorn configuration used to run the app in production, see entrypoint in
+app.yaml. Every setting can be changed with an environment variable.
+"""
+import os
+
+# Address to listen on. App Engine sets the PORT env var.
+bind = "0.0.0.0:" + os.environ.get("PORT", "8080")
+
+# Worker model: "gthread" serves requests from a pool of threads in every
+# worker, "sync" serves one request at a time per worker, and "gevent" serves
+# requests from greenlets, which requires the gevent library.
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+
+# Number of worker processes, and of threads in each gthread worker. The
+# worker count is fixed rather than derived from the CPU count, which reports
+# the cores of the host instead of the share of the App Engine instance class.
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))
+
+# Maximum number of connections per gthread or gevent worker.
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", "1000"))
+
+# Import the app once before forking the workers, so that they start faster and
+# share the memory of the loaded modules.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
@@ -0,0 +1,52 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+JSON provider that serializes the responses of the app without spaces or
+sorted keys, with the orjson library if it's installed, which is several times
+faster than the standard json module.
+"""
+
+from typing import Any
+from flask.json.provider import DefaultJSONProvider
+
+try:
+  import orjson
+except ImportError:
+  orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+  """Serializes JSON with orjson if it's installed, without spaces or sorted
+  keys."""
+
+  compact = True
+  sort_keys = False
+  ensure_ascii = False
+
+  def dumps(self, obj: Any, **kwargs: Any) -> str:
+    if orjson is None or kwargs:
+      return super().dumps(obj, **kwargs)
+    return orjson.dumps(obj, default=self.default).decode()
+
+  def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+    if orjson is None or kwargs:
+      return super().loads(s, **kwargs)
+    return orjson.loads(s)
+
+  def response(self, *args: Any, **kwargs: Any):
+    if orjson is None:
+      return super().response(*args, **kwargs)
+    obj = self._prepare_response_obj(args, kwargs)
+    return self._app.response_class(
+        orjson.dumps(obj, default=self.default), mimetype=self.mimetype)
@@ -15,8 +15,10 @@ Google Chat app with preview link in Python App Engine
 
 from typing import Any, Mapping
 from flask import Flask, request, json
+from json_provider import FastJSONProvider
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 
 @app.route('/', methods=['POST'])
 def post() -> Mapping[str, Any]:
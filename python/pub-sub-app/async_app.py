@@ -0,0 +1,295 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Asyncio runtime for the Pub/Sub app, selected with RUNTIME=asyncio.
+
+The subscriber callback hands every message to a coroutine on the event loop,
+which posts the response with the async Chat client. Thousands of posts can be
+in flight without a thread for each of them.
+"""
+
+import asyncio
+import collections
+import logging
+import os
+import random
+import signal
+import time
+from concurrent import futures
+from google.apps import chat_v1 as google_chat
+from google.cloud import pubsub_v1
+import chat_writer
+import dead_letter
+from consumer import (CHAT_API_ENDPOINT, CHAT_SCOPES, MAX_BYTES,
+                      MAX_LEASE_DURATION, MAX_MESSAGES, METRICS_INTERVAL,
+                      MIN_LEASE_EXTENSION, SHUTDOWN_TIMEOUT, create_chat_client,
+                      format_request, load_credentials, retry_delay)
+from decoding import decode_event
+from dedup import DONE, IN_PROGRESS, create_deduplicator, dedup_key
+from metrics import Metrics
+
+# Maximum number of responses being posted at once.
+MAX_CONCURRENT_POSTS = int(os.environ.get('MAX_CONCURRENT_POSTS', '1000'))
+
+
+class AsyncChatWriter:
+  """Posts CreateMessageRequests with the async Chat client, within the same
+  rate limits, retry policy and order within spaces as chat_writer.ChatWriter.
+
+  Must be used from a single event loop.
+  """
+
+  def __init__(self, chat, metrics, max_concurrent_posts=MAX_CONCURRENT_POSTS):
+    self.chat = chat
+    self.metrics = metrics
+    self.semaphore = asyncio.Semaphore(max_concurrent_posts)
+    self.global_bucket = chat_writer.TokenBucket(
+        chat_writer.GLOBAL_RATE, chat_writer.GLOBAL_BURST)
+    self.space_buckets = chat_writer.SpaceBuckets(
+        chat_writer.SPACE_RATE, chat_writer.SPACE_BURST)
+    # Locks that post the messages of a space one at a time. asyncio locks are
+    # fair, so messages are posted in the order post was called. The lock of a
+    # space is dropped once no post holds or waits for it.
+    self.space_locks = {}
+    self.space_waiters = collections.Counter()
+
+  async def _acquire(self, space_name):
+    """Waits until both rate limits allow a post to the space."""
+    while True:
+      now = time.monotonic()
+      space_bucket = self.space_buckets.get(space_name, now)
+      wait = max(self.global_bucket.wait_time(now), space_bucket.wait_time(now))
+      if wait <= 0:
+        self.global_bucket.take()
+        space_bucket.take()
+        return
+      await asyncio.sleep(wait)
+
+  async def post(self, request):
+    """Posts a request, retrying 429 and 5xx errors with backoff.
+
+    Raises the last error if the request can't be posted.
+    """
+    if not chat_writer.ORDER_BY_SPACE:
+      return await self._post(request)
+    space_name = request.parent
+    lock = self.space_locks.setdefault(space_name, asyncio.Lock())
+    self.space_waiters[space_name] += 1
+    try:
+      async with lock:
+        return await self._post(request)
+    finally:
+      self.space_waiters[space_name] -= 1
+      if not self.space_waiters[space_name]:
+        del self.space_waiters[space_name]
+        del self.space_locks[space_name]
+
+  async def _post(self, request):
+    for attempt in range(1, chat_writer.MAX_ATTEMPTS + 1):
+      await self._acquire(request.parent)
+      try:
+        async with self.semaphore:
+          await self.chat.create_message(request)
+        self.metrics.increment('posted')
+        return
+      except chat_writer.RETRYABLE_ERRORS as e:
+        if attempt == chat_writer.MAX_ATTEMPTS:
+          logging.error('Giving up post to %s after %d attempts: %s',
+                        request.parent, attempt, e)
+          self.metrics.increment('post_failed')
+          raise
+        self.metrics.increment('post_retried')
+        backoff = min(chat_writer.MAX_BACKOFF,
+                      chat_writer.INITIAL_BACKOFF * 2 ** (attempt - 1))
+        await asyncio.sleep(random.uniform(0, backoff))
+      except Exception as e:
+        logging.error('Failed to post to %s: %s', request.parent, e)
+        self.metrics.increment('post_failed')
+        raise
+
+
+class ThreadedChatClient:
+  """Async wrapper that runs the calls of a sync Chat client on threads.
+
+  Args:
+    chat: The sync Chat client.
+    threads: The number of threads that call the client.
+  """
+
+  def __init__(self, chat, threads=chat_writer.WRITER_THREADS):
+    self.chat = chat
+    self.executor = futures.ThreadPoolExecutor(
+        threads, thread_name_prefix='chat')
+
+  async def create_message(self, request):
+    return await asyncio.get_running_loop().run_in_executor(
+        self.executor, self.chat.create_message, request)
+
+
+def create_async_chat_client():
+  """Creates the async Chat API client, authenticated as the app.
+
+  The async client only supports gRPC, so with CHAT_API_ENDPOINT the sync REST
+  client of consumer.create_chat_client is called on threads instead.
+  """
+  if CHAT_API_ENDPOINT:
+    return ThreadedChatClient(create_chat_client())
+  return google_chat.ChatServiceAsyncClient(
+    credentials = load_credentials(),
+    client_options = {
+      "scopes": CHAT_SCOPES
+    })
+
+
+async def receive_messages():
+  """Receives messages from a pull subscription and handles them on the
+  event loop, until SIGINT or SIGTERM or until the subscription stops with an
+  error."""
+
+  chat = create_async_chat_client()
+
+  project_id = os.environ.get('PROJECT_ID')
+  subscription_id = os.environ.get('SUBSCRIPTION_ID')
+  subscriber = pubsub_v1.SubscriberClient()
+  subscription_path = subscriber.subscription_path(
+      project_id, subscription_id)
+  metrics = Metrics()
+  writer = AsyncChatWriter(chat, metrics)
+  deduplicator = create_deduplicator()
+  dead_letter_sink = dead_letter.create_dead_letter_sink()
+  loop = asyncio.get_running_loop()
+  in_flight = set()
+  held = []
+  stopping = asyncio.Event()
+
+  def ack(message, start):
+    message.ack()
+    metrics.increment('acked')
+    metrics.observe('ack_latency', time.monotonic() - start)
+
+  def retry_later(message):
+    # Redeliver the message after a delay instead of right away.
+    message.modify_ack_deadline(retry_delay(message))
+    message.drop()
+    metrics.increment('nacked')
+
+  def fail(message, start, claimed_key, error_class, error):
+    """Acks and dead-letters poison messages, and retries the others."""
+    metrics.increment(f'error_{error_class}')
+    if error_class in dead_letter.PERMANENT_ERRORS:
+      if claimed_key is not None:
+        deduplicator.complete(claimed_key)
+      dead_letter_sink.send(message, error_class, error)
+      metrics.increment('dead_lettered')
+      ack(message, start)
+    else:
+      if claimed_key is not None:
+        deduplicator.release(claimed_key)
+      retry_later(message)
+
+  async def handle(message):
+    start = time.monotonic()
+    metrics.increment('received')
+    try:
+      event = decode_event(message.data)
+      logging.debug('Data : %s', event)
+      key = dedup_key(event, message)
+      state = deduplicator.claim(key)
+    except Exception as e:
+      fail(message, start, None, dead_letter.classify_event_error(e), e)
+      return
+    if state == IN_PROGRESS:
+      metrics.increment('duplicate_in_progress')
+      retry_later(message)
+      return
+    if state == DONE:
+      metrics.increment('duplicate')
+      ack(message, start)
+      return
+    try:
+      request = format_request(event)
+    except Exception as e:
+      fail(message, start, key, dead_letter.classify_event_error(e), e)
+      return
+    if request is not None:
+      try:
+        await writer.post(request)
+      except Exception as e:
+        fail(message, start, key, dead_letter.classify_post_error(e), e)
+        return
+    deduplicator.complete(key)
+    ack(message, start)
+
+  def done(task):
+    in_flight.discard(task)
+    metrics.add_to_gauge('in_flight', -1)
+
+  def track(message):
+    if stopping.is_set():
+      # The app is shutting down: hold the message, so that it keeps counting
+      # towards flow control, and nack it right before the subscriber stops.
+      held.append(message)
+      metrics.increment('shutdown_held')
+      return
+    task = loop.create_task(handle(message))
+    in_flight.add(task)
+    metrics.add_to_gauge('in_flight', 1)
+    task.add_done_callback(done)
+
+  # Runs on the subscriber threads: schedule the message on the event loop and
+  # return right away. Flow control bounds the number of in-flight messages.
+  def callback(message):
+    loop.call_soon_threadsafe(track, message)
+
+  flow_control = pubsub_v1.types.FlowControl(
+      max_messages = MAX_MESSAGES,
+      max_bytes = MAX_BYTES,
+      max_lease_duration = MAX_LEASE_DURATION,
+      min_duration_per_lease_extension = MIN_LEASE_EXTENSION)
+  streaming_pull_future = subscriber.subscribe(
+      subscription_path, callback = callback, flow_control = flow_control)
+  logging.info('Listening for messages on %s', subscription_path)
+
+  for sig in (signal.SIGINT, signal.SIGTERM):
+    loop.add_signal_handler(sig, stopping.set)
+  streaming_pull_future.add_done_callback(
+      lambda future: loop.call_soon_threadsafe(stopping.set))
+  while not stopping.is_set():
+    try:
+      await asyncio.wait_for(stopping.wait(), METRICS_INTERVAL)
+    except asyncio.TimeoutError:
+      logging.info('Metrics : %s', metrics.summary())
+  if streaming_pull_future.done():
+    # The subscription failed: raise its error.
+    streaming_pull_future.result()
+    return
+
+  # Finish the messages in flight while their leases are still extended, and
+  # only then stop the subscriber, since it drops the acks sent after it
+  # stopped. Messages that don't finish in time are redelivered when their
+  # lease expires. Messages received meanwhile are held, which stops the
+  # subscriber from pulling more once the flow control limits are reached.
+  logging.info('Shutting down with %d messages in flight', len(in_flight))
+  pending = ()
+  if in_flight:
+    _, pending = await asyncio.wait(in_flight, timeout = SHUTDOWN_TIMEOUT)
+    for task in pending:
+      task.cancel()
+  for message in held:
+    message.nack()
+  streaming_pull_future.cancel()
+  await loop.run_in_executor(None, streaming_pull_future.result)
+  subscriber.close()
+  logging.info('Drained messages, %d left unfinished, %d held and nacked',
+               len(pending), len(held))
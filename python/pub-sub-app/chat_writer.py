@@ -0,0 +1,271 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Rate-limited writer that posts messages to Google Chat from a pool of threads.
+"""
+
+import collections
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, NamedTuple
+from google.api_core import exceptions
+
+# Errors returned by the Chat API that are worth retrying: 429 and 5xx.
+RETRYABLE_ERRORS = (exceptions.TooManyRequests, exceptions.ServerError)
+
+# Number of threads that post messages.
+WRITER_THREADS = int(os.environ.get('WRITER_THREADS', '10'))
+
+# Messages posted per second across all spaces, and the allowed burst.
+GLOBAL_RATE = float(os.environ.get('GLOBAL_RATE', '50'))
+GLOBAL_BURST = float(os.environ.get('GLOBAL_BURST', '100'))
+
+# Messages posted per second in a single space, and the allowed burst.
+SPACE_RATE = float(os.environ.get('SPACE_RATE', '1'))
+SPACE_BURST = float(os.environ.get('SPACE_BURST', '5'))
+
+# Maximum number of attempts to post a message.
+MAX_ATTEMPTS = int(os.environ.get('MAX_ATTEMPTS', '5'))
+
+# Whether to post the messages of a space one at a time, in the order they were
+# submitted. Messages of different spaces are still posted in parallel.
+# Messages submitted from several threads are only in the order they were
+# received on a best-effort basis.
+ORDER_BY_SPACE = os.environ.get('ORDER_BY_SPACE', 'true').lower() == 'true'
+
+# Delay in seconds before the first retry, doubled on every attempt.
+INITIAL_BACKOFF = 1.0
+
+# Upper bound in seconds for the delay between retries.
+MAX_BACKOFF = 30.0
+
+# Seconds between sweeps of the rate limits of spaces that are no longer active.
+IDLE_SWEEP_INTERVAL = 60.0
+
+
+class TokenBucket:
+  """Allows `rate` operations per second, with bursts of up to `burst`."""
+
+  def __init__(self, rate, burst):
+    self.rate = rate
+    self.burst = burst
+    self.tokens = burst
+    self.updated = time.monotonic()
+
+  def wait_time(self, now):
+    """Returns the seconds until a token is available, or 0 if one is."""
+    self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+    self.updated = now
+    if self.tokens >= 1:
+      return 0
+    return (1 - self.tokens) / self.rate
+
+  def take(self):
+    """Takes a token. Call only when wait_time returned 0."""
+    self.tokens -= 1
+
+  def is_full(self, now):
+    """Returns whether the bucket refilled completely, like a new bucket."""
+    return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+class SpaceBuckets:
+  """The token buckets of the spaces, created on first use.
+
+  Buckets that refilled completely are the same as new ones, so they're
+  dropped every `sweep_interval` seconds, and spaces that are no longer active
+  don't take memory. Not thread-safe.
+  """
+
+  def __init__(self, rate, burst, sweep_interval=IDLE_SWEEP_INTERVAL):
+    self.rate = rate
+    self.burst = burst
+    self.sweep_interval = sweep_interval
+    self.buckets = {}
+    self.swept_at = time.monotonic()
+
+  def __len__(self):
+    return len(self.buckets)
+
+  def get(self, space_name, now):
+    """Returns the bucket of a space."""
+    if now - self.swept_at >= self.sweep_interval:
+      self.swept_at = now
+      self.buckets = {name: bucket for name, bucket in self.buckets.items()
+                      if not bucket.is_full(now)}
+    bucket = self.buckets.get(space_name)
+    if bucket is None:
+      bucket = TokenBucket(self.rate, self.burst)
+      self.buckets[space_name] = bucket
+    return bucket
+
+
+class WriteJob(NamedTuple):
+  """A message waiting to be posted, ordered by the time it can be posted."""
+  ready_at: float
+  seq: int
+  request: Any
+  on_success: Callable[[], None]
+  on_failure: Callable[[Exception], None]
+  attempt: int
+
+
+class ChatWriter:
+  """Posts CreateMessageRequests within per-space and global rate limits.
+
+  Requests that fail with a 429 or 5xx error are retried with exponential
+  backoff and jitter. on_success is called once the message is posted, and
+  on_failure with the last error once it fails permanently. The queue isn't
+  bounded by the writer, so callers must limit the requests they submit, for
+  example with the flow control of the Pub/Sub subscriber.
+
+  With order_by_space, every space is a serial lane: a message is posted only
+  after the previous message submitted for its space was posted or failed
+  permanently, including its retries, while lanes of different spaces run in
+  parallel. Lanes keep the order of submit calls, so messages submitted
+  concurrently from several threads are posted in whichever order they were
+  submitted.
+
+  Args:
+    chat: The Chat API client.
+    metrics: The metrics to report to.
+  """
+
+  def __init__(self, chat, metrics, threads=WRITER_THREADS,
+               global_rate=GLOBAL_RATE, global_burst=GLOBAL_BURST,
+               space_rate=SPACE_RATE, space_burst=SPACE_BURST,
+               max_attempts=MAX_ATTEMPTS, initial_backoff=INITIAL_BACKOFF,
+               order_by_space=ORDER_BY_SPACE):
+    self.chat = chat
+    self.metrics = metrics
+    self.threads = threads
+    self.max_attempts = max_attempts
+    self.initial_backoff = initial_backoff
+    self.order_by_space = order_by_space
+    self.global_bucket = TokenBucket(global_rate, global_burst)
+    self.space_buckets = SpaceBuckets(space_rate, space_burst)
+    # Messages waiting for the message being posted in their space, by space.
+    # A space is in the dict while one of its messages is being posted.
+    self.lanes = {}
+    self.jobs = []
+    self.seq = itertools.count()
+    self.condition = threading.Condition()
+    self.workers = []
+
+  def start(self):
+    """Starts the writer threads."""
+    for i in range(self.threads):
+      worker = threading.Thread(
+          target=self._run, name=f'chat-writer-{i}', daemon=True)
+      worker.start()
+      self.workers.append(worker)
+
+  def submit(self, request, on_success, on_failure):
+    """Queues a request to be posted."""
+    job = WriteJob(
+        time.monotonic(), next(self.seq), request, on_success, on_failure, 1)
+    self.metrics.add_to_gauge('writer_queue_depth', 1)
+    if self.order_by_space:
+      with self.condition:
+        lane = self.lanes.get(request.parent)
+        if lane is not None:
+          lane.append(job)
+          return
+        self.lanes[request.parent] = collections.deque()
+    self._push(job)
+
+  def _push(self, job):
+    with self.condition:
+      heapq.heappush(self.jobs, job)
+      self.condition.notify()
+
+  def _next_job(self):
+    """Waits for a job that is ready and within the rate limits."""
+    with self.condition:
+      while True:
+        if not self.jobs:
+          self.condition.wait()
+          continue
+        now = time.monotonic()
+        job = self.jobs[0]
+        if job.ready_at > now:
+          self.condition.wait(job.ready_at - now)
+          continue
+        heapq.heappop(self.jobs)
+        space_bucket = self.space_buckets.get(job.request.parent, now)
+        wait = max(self.global_bucket.wait_time(now), space_bucket.wait_time(now))
+        if wait > 0:
+          # Put the job back until both limits allow it.
+          heapq.heappush(self.jobs, job._replace(ready_at = now + wait))
+          continue
+        self.global_bucket.take()
+        space_bucket.take()
+        return job
+
+  def _run(self):
+    while True:
+      job = self._next_job()
+      try:
+        self._post(job)
+      except Exception:
+        logging.exception('Unexpected error in Chat writer')
+
+  def _post(self, job):
+    start = time.monotonic()
+    try:
+      self.chat.create_message(job.request)
+    except RETRYABLE_ERRORS as e:
+      if job.attempt < self.max_attempts:
+        backoff = min(MAX_BACKOFF, self.initial_backoff * 2 ** (job.attempt - 1))
+        logging.warning('Retrying post to %s in up to %.1fs: %s',
+                        job.request.parent, backoff, e)
+        self.metrics.increment('post_retried')
+        self._push(job._replace(
+            ready_at = time.monotonic() + random.uniform(0, backoff),
+            attempt = job.attempt + 1))
+        return
+      logging.error('Giving up post to %s after %d attempts: %s',
+                    job.request.parent, job.attempt, e)
+      self._finish(job, 'post_failed', job.on_failure, e)
+    except Exception as e:
+      logging.error('Failed to post to %s: %s', job.request.parent, e)
+      self._finish(job, 'post_failed', job.on_failure, e)
+    else:
+      self.metrics.observe('post_latency', time.monotonic() - start)
+      self._finish(job, 'posted', job.on_success)
+
+  def _finish(self, job, counter, callback, *args):
+    self.metrics.add_to_gauge('writer_queue_depth', -1)
+    self.metrics.increment(counter)
+    try:
+      callback(*args)
+    finally:
+      if self.order_by_space:
+        self._next_in_lane(job.request.parent)
+
+  def _next_in_lane(self, space_name):
+    """Schedules the next message of a space, once the previous finished."""
+    with self.condition:
+      lane = self.lanes[space_name]
+      if not lane:
+        del self.lanes[space_name]
+        return
+      job = lane.popleft()
+      heapq.heappush(self.jobs, job._replace(ready_at = time.monotonic()))
+      self.condition.notify()
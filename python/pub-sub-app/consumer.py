@@ -0,0 +1,415 @@
+# Copyright 2017 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Google Chat App that listens for messages via Cloud Pub/Sub, tuned for burst
+traffic. app.py is the minimal version of the same app.
+"""
+
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent import futures
+from google.apps import chat_v1 as google_chat
+from google.cloud import pubsub_v1
+from google.cloud.pubsub_v1.subscriber.scheduler import ThreadScheduler
+from google.oauth2.service_account import Credentials
+import dead_letter
+from chat_writer import ChatWriter
+from decoding import decode_event
+from dedup import DONE, IN_PROGRESS, create_deduplicator, dedup_key
+from metrics import MeteredThreadPoolExecutor, Metrics
+
+# Maximum number of messages leased by the subscriber and not yet acked.
+MAX_MESSAGES = int(os.environ.get('MAX_MESSAGES', '100'))
+
+# Maximum total size in bytes of the leased messages.
+MAX_BYTES = int(os.environ.get('MAX_BYTES', str(10 * 1024 * 1024)))
+
+# Maximum seconds that the subscriber extends the lease of a message still
+# being handled, and minimum seconds of every extension. Extensions longer
+# than a slow post with its retries avoid redeliveries of messages in progress.
+MAX_LEASE_DURATION = int(os.environ.get('MAX_LEASE_DURATION', '600'))
+MIN_LEASE_EXTENSION = int(os.environ.get('MIN_LEASE_EXTENSION', '60'))
+
+# Seconds before a message that failed with a retryable error is redelivered,
+# doubled on every delivery attempt up to the maximum ack deadline. Attempts
+# are counted only if the subscription has a dead-letter policy.
+RETRY_DELAY = 10
+MAX_RETRY_DELAY = 600
+
+# Seconds to wait for the messages in flight when shutting down.
+SHUTDOWN_TIMEOUT = float(os.environ.get('SHUTDOWN_TIMEOUT', '30'))
+
+# Number of threads that run the message callback.
+CALLBACK_THREADS = int(os.environ.get('CALLBACK_THREADS', '10'))
+
+# Seconds between metrics reports.
+METRICS_INTERVAL = int(os.environ.get('METRICS_INTERVAL', '60'))
+
+# Whether to handle messages on threads or on an asyncio event loop.
+RUNTIME = os.environ.get('RUNTIME', 'threads')
+
+# Number of processes that pull messages, each with its own subscriber and
+# Chat client. With more than one, a supervisor process restarts them.
+PROCESSES = int(os.environ.get('PROCESSES', '1'))
+
+# Chat API endpoint to use instead of Google Chat, such as a local fake for load
+# tests. Requests are sent over REST without credentials.
+CHAT_API_ENDPOINT = os.environ.get('CHAT_API_ENDPOINT')
+
+# Scopes of the Chat API requests of the app.
+CHAT_SCOPES = ['https://www.googleapis.com/auth/chat.bot']
+
+# Format of the log messages.
+LOG_FORMAT = '{levelname:.1}{asctime} {processName} {filename}:{lineno}] {message}'
+
+
+def create_chat_client():
+  """Creates the Chat API client, authenticated as the app."""
+  if CHAT_API_ENDPOINT:
+    from google.auth.credentials import AnonymousCredentials
+    return google_chat.ChatServiceClient(
+      credentials = AnonymousCredentials(),
+      transport = 'rest',
+      client_options = {
+        "api_endpoint": CHAT_API_ENDPOINT
+      })
+
+  return google_chat.ChatServiceClient(
+    credentials = load_credentials(),
+    client_options = {
+      "scopes": CHAT_SCOPES
+    })
+
+
+def load_credentials():
+  """Loads the service account credentials of the app."""
+  service_account_key_path = os.environ.get(
+    'GOOGLE_APPLICATION_CREDENTIALS')
+  return Credentials.from_service_account_file(
+    service_account_key_path)
+
+
+class InFlightMessages:
+  """Counts the messages received and not yet acked or nacked, so that the app
+  can stop taking new messages and wait for these when shutting down.
+
+  Messages received while draining are held, neither acked nor nacked, so that
+  they keep counting towards the flow control limits and the subscriber stops
+  pulling more. They are nacked once, when the subscriber is about to stop.
+  """
+
+  def __init__(self):
+    self.count = 0
+    self.draining = False
+    self.held = []
+    self.condition = threading.Condition()
+
+  def start(self, message=None):
+    """Counts a received message. Returns False, and holds the message, if the
+    app is shutting down."""
+    with self.condition:
+      if self.draining:
+        if message is not None:
+          self.held.append(message)
+        return False
+      self.count += 1
+      return True
+
+  def finish(self):
+    """Counts a message as acked or nacked."""
+    with self.condition:
+      self.count -= 1
+      self.condition.notify_all()
+
+  def drain(self, timeout):
+    """Stops taking new messages and waits for the ones in flight.
+
+    Returns the number of messages still in flight after the timeout.
+    """
+    with self.condition:
+      self.draining = True
+      self.condition.wait_for(lambda: self.count == 0, timeout)
+      return self.count
+
+  def nack_held(self):
+    """Nacks the messages held while draining. Returns their number."""
+    with self.condition:
+      held, self.held = self.held, []
+    for message in held:
+      message.nack()
+    return len(held)
+
+
+def receive_messages():
+  """Receives messages from a pull subscription, until SIGINT or SIGTERM or
+  until the subscription stops with an error."""
+
+  chat = create_chat_client()
+
+  project_id = os.environ.get('PROJECT_ID')
+  subscription_id = os.environ.get('SUBSCRIPTION_ID')
+  subscriber = pubsub_v1.SubscriberClient()
+  subscription_path = subscriber.subscription_path(
+      project_id, subscription_id)
+  metrics = Metrics()
+
+  # Post responses to Google Chat within the API rate limits.
+  writer = ChatWriter(chat, metrics)
+  writer.start()
+  in_flight = InFlightMessages()
+  callback = create_callback(
+      writer, create_deduplicator(), metrics, in_flight,
+      dead_letter.create_dead_letter_sink())
+
+  # Limit the messages held by the subscriber, and run the callback on a
+  # dedicated pool of threads. The subscriber extends the leases of messages
+  # until they are acked or nacked.
+  flow_control = pubsub_v1.types.FlowControl(
+      max_messages = MAX_MESSAGES,
+      max_bytes = MAX_BYTES,
+      max_lease_duration = MAX_LEASE_DURATION,
+      min_duration_per_lease_extension = MIN_LEASE_EXTENSION)
+  executor = MeteredThreadPoolExecutor(metrics, 'callback', CALLBACK_THREADS)
+  streaming_pull_future = subscriber.subscribe(
+      subscription_path,
+      callback = callback,
+      flow_control = flow_control,
+      scheduler = ThreadScheduler(executor))
+  logging.info('Listening for messages on %s', subscription_path)
+
+  # Keep main thread from exiting while waiting for messages, and report
+  # metrics periodically.
+  stopping = threading.Event()
+  signal.signal(signal.SIGINT, lambda signum, frame: stopping.set())
+  signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+  streaming_pull_future.add_done_callback(lambda future: stopping.set())
+  while not stopping.wait(METRICS_INTERVAL):
+    logging.info('Metrics : %s', metrics.summary())
+  if streaming_pull_future.done():
+    # The subscription failed: raise its error.
+    streaming_pull_future.result()
+    return
+
+  # Finish the messages in flight while their leases are still extended, and
+  # only then stop the subscriber, since it drops the acks sent after it
+  # stopped. Messages that don't finish in time are redelivered when their
+  # lease expires.
+  # Messages received meanwhile are held, which stops the subscriber from
+  # pulling more once the flow control limits are reached, and are nacked right
+  # before it stops so that other subscribers handle them.
+  logging.info('Shutting down with %d messages in flight', in_flight.count)
+  unfinished = in_flight.drain(SHUTDOWN_TIMEOUT)
+  held = in_flight.nack_held()
+  streaming_pull_future.cancel()
+  try:
+    streaming_pull_future.result(timeout = SHUTDOWN_TIMEOUT)
+  except futures.CancelledError:
+    pass
+  subscriber.close()
+  logging.info('Drained messages, %d left unfinished, %d held and nacked',
+               unfinished, held)
+  logging.info('Metrics : %s', metrics.summary())
+
+
+def retry_delay(message):
+  """Returns the seconds before a failed message should be redelivered."""
+  attempt = message.delivery_attempt or 1
+  return min(MAX_RETRY_DELAY, RETRY_DELAY * 2 ** (attempt - 1))
+
+
+def create_callback(writer, deduplicator, metrics, in_flight=None,
+                    dead_letter_sink=None):
+  """Creates the callback that handles the messages of the subscription.
+
+  Args:
+    writer: The ChatWriter that posts the responses.
+    deduplicator: The Deduplicator that skips events already handled.
+    metrics: The metrics to report to.
+    in_flight: The InFlightMessages that counts the messages being handled.
+    dead_letter_sink: The sink that receives poison messages.
+  """
+  if in_flight is None:
+    in_flight = InFlightMessages()
+  if dead_letter_sink is None:
+    dead_letter_sink = dead_letter.LoggingSink()
+
+  def ack(message, start):
+    message.ack()
+    in_flight.finish()
+    metrics.increment('acked')
+    metrics.observe('ack_latency', time.monotonic() - start)
+    metrics.observe(
+        'publish_to_ack', time.time() - message.publish_time.timestamp())
+
+  def retry_later(message):
+    # Release the message from lease management with a deadline, rather than
+    # nack it, so that it's redelivered after a delay instead of right away.
+    message.modify_ack_deadline(retry_delay(message))
+    message.drop()
+    in_flight.finish()
+    metrics.increment('nacked')
+
+  def fail(message, start, claimed_key, error_class, error):
+    """Acks and dead-letters poison messages, and retries the others."""
+    metrics.increment(f'error_{error_class}')
+    if error_class in dead_letter.PERMANENT_ERRORS:
+      if claimed_key is not None:
+        deduplicator.complete(claimed_key)
+      dead_letter_sink.send(message, error_class, error)
+      metrics.increment('dead_lettered')
+      ack(message, start)
+    else:
+      if claimed_key is not None:
+        deduplicator.release(claimed_key)
+      retry_later(message)
+
+  # Handle incoming message, then ack/nack the received message
+  def callback(message):
+    start = time.monotonic()
+    metrics.increment('received')
+    if not in_flight.start(message):
+      # The app is shutting down: the message is held, and nacked right before
+      # the subscriber stops so that another subscriber handles it.
+      metrics.increment('shutdown_held')
+      return
+    # The key of the event once it's claimed, to complete or release it.
+    claimed_key = None
+    try:
+      event = decode_event(message.data)
+      logging.debug('Data : %s', event)
+
+      # Skip events that were already handled, and retry later the ones being
+      # handled by another delivery.
+      key = dedup_key(event, message)
+      state = deduplicator.claim(key)
+      if state == DONE:
+        metrics.increment('duplicate')
+        ack(message, start)
+        return
+      if state == IN_PROGRESS:
+        metrics.increment('duplicate_in_progress')
+        retry_later(message)
+        return
+      claimed_key = key
+      request = format_request(event)
+    except Exception as e:
+      fail(message, start, claimed_key,
+           dead_letter.classify_event_error(e), e)
+      return
+
+    def on_success():
+      deduplicator.complete(key)
+      ack(message, start)
+
+    def on_failure(error):
+      fail(message, start, key, dead_letter.classify_post_error(error), error)
+
+    # Post the response to Google Chat. The writer acks the message once the
+    # response is posted, or retries or dead-letters it if posting fails.
+    if request is not None:
+      writer.submit(request, on_success = on_success, on_failure = on_failure)
+    else:
+      on_success()
+
+  return callback
+
+
+# Templates of the requests that the app posts, built once. format_request
+# copies them and fills in the fields that depend on the event, which is several
+# times faster than building every request from dictionaries.
+THANK_YOU_TEMPLATE = google_chat.CreateMessageRequest.pb(
+    google_chat.CreateMessageRequest(
+        message = {
+          'text': 'Thank you for adding me!'
+        }
+    ))
+REPLY_TEMPLATE = google_chat.CreateMessageRequest.pb(
+    google_chat.CreateMessageRequest(
+        message_reply_option = google_chat.CreateMessageRequest.MessageReplyOption.REPLY_MESSAGE_FALLBACK_TO_NEW_THREAD
+    ))
+
+
+def new_request(template):
+  """Returns a copy of a request template, as a raw protobuf message."""
+  request = type(template)()
+  request.CopyFrom(template)
+  return request
+
+
+def format_request(event):
+  """Send message to Google Chat based on the type of event.
+  Args:
+    event: A dictionary with the event data.
+  """
+  space_name = event['space']['name']
+  event_type = event['type']
+
+  # If the app was removed, we don't respond.
+  if event['type'] == 'REMOVED_FROM_SPACE':
+    logging.info('App removed rom space %s', space_name)
+    return
+  elif event_type == 'ADDED_TO_SPACE' and 'message' not in event:
+    # An app can also be added to a space by @mentioning it in a
+    # message. In that case, we fall through to the message case
+    # and let the app respond. If the app was added using the
+    # invite flow, we just post a thank you message in the space.
+    request = new_request(THANK_YOU_TEMPLATE)
+    request.parent = space_name
+    return google_chat.CreateMessageRequest.wrap(request)
+  elif event_type in ['ADDED_TO_SPACE', 'MESSAGE']:
+    # In case of message, post the response in the same thread.
+    request = new_request(REPLY_TEMPLATE)
+    request.parent = space_name
+    request.message.text = 'You said: `' + event['message']['text'] + '`'
+    request.message.thread.name = event['message']['thread']['name']
+    return google_chat.CreateMessageRequest.wrap(request)
+
+
+def run():
+  """Receives messages in the current process with the configured runtime."""
+  if RUNTIME == 'asyncio':
+    import asyncio
+    import async_app
+    asyncio.run(async_app.receive_messages())
+  else:
+    receive_messages()
+
+
+if __name__ == '__main__':
+  if 'PROJECT_ID' not in os.environ:
+    logging.error('Missing PROJECT_ID env var.')
+    sys.exit(1)
+
+  if 'SUBSCRIPTION_ID' not in os.environ:
+    logging.error('Missing SUBSCRIPTION_ID env var.')
+    sys.exit(1)
+
+  if ('GOOGLE_APPLICATION_CREDENTIALS' not in os.environ
+      and not CHAT_API_ENDPOINT):
+    logging.error('Missing GOOGLE_APPLICATION_CREDENTIALS env var.')
+    sys.exit(1)
+
+  logging.basicConfig(
+      level=logging.INFO,
+      style='{',
+      format=LOG_FORMAT)
+  if PROCESSES > 1:
+    import supervisor
+    supervisor.supervise(PROCESSES)
+  else:
+    run()
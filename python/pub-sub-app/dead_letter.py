@@ -0,0 +1,115 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Classification of the errors raised while handling events, and the dead-letter
+sinks that receive poison messages.
+
+Poison messages fail the same way on every delivery, for example because the
+event is malformed or the Chat API rejects the response. They are acked and
+sent to a dead-letter sink, instead of being redelivered forever.
+"""
+
+import logging
+import os
+from google.api_core import exceptions
+from google.cloud import pubsub_v1
+import chat_writer
+
+# The payload isn't valid JSON.
+INVALID_PAYLOAD = 'invalid_payload'
+
+# The event lacks fields that the app needs, such as the message or its thread.
+MALFORMED_EVENT = 'malformed_event'
+
+# The Chat API rejected the response, for example because the space was deleted
+# or the app was removed from it.
+CHAT_REJECTED = 'chat_rejected'
+
+# The Chat API kept returning 429 or 5xx errors.
+CHAT_UNAVAILABLE = 'chat_unavailable'
+
+# Any other error.
+UNEXPECTED = 'unexpected'
+
+# Error classes that fail again on every delivery.
+PERMANENT_ERRORS = frozenset([INVALID_PAYLOAD, MALFORMED_EVENT, CHAT_REJECTED])
+
+# Errors returned by the Chat API that retrying won't fix.
+REJECTED_ERRORS = (
+    exceptions.BadRequest, exceptions.NotFound, exceptions.PermissionDenied)
+
+# Pub/Sub topic that receives poison messages, as projects/PROJECT/topics/TOPIC.
+# If unset, poison messages are logged.
+DEAD_LETTER_TOPIC = os.environ.get('DEAD_LETTER_TOPIC', '')
+
+# Maximum number of bytes of a poison message that are logged.
+MAX_LOGGED_BYTES = 1024
+
+
+def classify_event_error(error):
+  """Returns the class of an error raised while decoding or formatting an
+  event."""
+  if isinstance(error, ValueError):
+    # Includes JSON and UTF-8 decoding errors.
+    return INVALID_PAYLOAD
+  if isinstance(error, (KeyError, TypeError, AttributeError)):
+    return MALFORMED_EVENT
+  return UNEXPECTED
+
+
+def classify_post_error(error):
+  """Returns the class of an error raised while posting a response."""
+  if isinstance(error, REJECTED_ERRORS):
+    return CHAT_REJECTED
+  if isinstance(error, chat_writer.RETRYABLE_ERRORS):
+    return CHAT_UNAVAILABLE
+  return UNEXPECTED
+
+
+class LoggingSink:
+  """Logs poison messages at error level."""
+
+  def send(self, message, error_class, error):
+    logging.error('Dead letter %s, %s: %r, data: %r', message.message_id,
+                  error_class, error, message.data[:MAX_LOGGED_BYTES])
+
+
+class PubSubSink:
+  """Publishes poison messages to a Pub/Sub topic, with the error in the
+  message attributes."""
+
+  def __init__(self, topic):
+    self.publisher = pubsub_v1.PublisherClient()
+    self.topic = topic
+
+  def send(self, message, error_class, error):
+    future = self.publisher.publish(
+        self.topic, message.data,
+        original_message_id = message.message_id,
+        error_class = error_class,
+        error = repr(error)[:MAX_LOGGED_BYTES])
+
+    def done(future):
+      if future.exception() is not None:
+        logging.error('Failed to publish dead letter %s: %s',
+                      message.message_id, future.exception())
+
+    future.add_done_callback(done)
+
+
+def create_dead_letter_sink():
+  """Creates the dead-letter sink configured by the environment."""
+  if DEAD_LETTER_TOPIC:
+    return PubSubSink(DEAD_LETTER_TOPIC)
+  return LoggingSink()
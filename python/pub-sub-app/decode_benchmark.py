@@ -0,0 +1,73 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measures how many messages per second a single core can decode and turn into
+CreateMessageRequests, comparing full decoding with payload logging against
+the decoding stage of the app.
+
+Usage:
+  python decode_benchmark.py [--messages N]
+"""
+
+import argparse
+import io
+import json
+import logging
+import time
+import decoding
+from consumer import format_request
+from synthetic_events import synthetic_event
+
+
+def full_decode(data):
+  """Decodes and logs the whole payload, like the app used to."""
+  event = json.loads(data)
+  logging.info('Data : %s', event)
+  return format_request(event)
+
+
+def stage_decode(data):
+  """Decodes the fields the app uses, and logs them at debug level."""
+  event = decoding.decode_event(data)
+  logging.debug('Data : %s', event)
+  return format_request(event)
+
+
+def measure(handler, payloads):
+  """Returns the messages handled per CPU second."""
+  start = time.process_time()
+  for data in payloads:
+    handler(data)
+  return len(payloads) / (time.process_time() - start)
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--messages', type=int, default=50000)
+  args = parser.parse_args()
+
+  # Log to memory at INFO level, like a deployed app logging to a file.
+  logging.basicConfig(level=logging.INFO, stream=io.StringIO())
+  payloads = [
+      json.dumps(synthetic_event('MESSAGE', f'space{i % 100}', i)).encode()
+      for i in range(args.messages)]
+
+  print(f'JSON backend: {decoding.loads.__module__}')
+  for name, handler in [('full decode', full_decode),
+                        ('decoding stage', stage_decode)]:
+    print(f'{name}: {measure(handler, payloads):,.0f} messages/s per core')
+
+
+if __name__ == '__main__':
+  main()
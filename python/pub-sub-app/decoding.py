@@ -0,0 +1,56 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Decodes the Chat events received through Pub/Sub.
+
+If the orjson library is installed, it's used instead of the standard json
+module, which is several times slower.
+"""
+
+import json
+
+try:
+  import orjson
+  loads = orjson.loads
+except ImportError:
+  loads = json.loads
+
+
+def decode_event(data):
+  """Decodes an event, keeping only the fields the app uses.
+
+  The rest of the payload, such as the user, the annotations and the space
+  details, is dropped right away.
+
+  Args:
+    data: The JSON-encoded event, as bytes.
+
+  Returns:
+    A dictionary with the type, space name and, if the event has a message,
+    its name, text and thread name.
+  """
+  event = loads(data)
+  decoded = {
+      'type': event.get('type'),
+      'space': {'name': event.get('space', {}).get('name')}
+  }
+  if (message := event.get('message')) is not None:
+    decoded_message = {}
+    for field in ('name', 'text'):
+      if field in message:
+        decoded_message[field] = message[field]
+    if 'thread' in message:
+      decoded_message['thread'] = {'name': message['thread'].get('name')}
+    decoded['message'] = decoded_message
+  return decoded
@@ -0,0 +1,220 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Deduplication of events, since Pub/Sub delivers messages at least once.
+
+An event is claimed before it's handled, completed once its response is
+posted, and released if handling fails so that a redelivery can retry it.
+"""
+
+import collections
+import datetime
+import os
+import threading
+import time
+
+# The event is new and the caller must handle it.
+CLAIMED = 'claimed'
+
+# Another delivery of the event is being handled.
+IN_PROGRESS = 'in_progress'
+
+# The event was already handled.
+DONE = 'done'
+
+# Maximum number of events remembered in memory.
+DEDUP_CACHE_SIZE = int(os.environ.get('DEDUP_CACHE_SIZE', '100000'))
+
+# Optional store shared by every process of the app: 'firestore' or unset.
+DEDUP_STORE = os.environ.get('DEDUP_STORE', '')
+
+# Days that handled events are kept in the shared store.
+DEDUP_TTL_DAYS = 7
+
+# Seconds after which a claim is considered abandoned, for example because its
+# process crashed, and another delivery can take it over. The subscriber stops
+# extending the lease of a message after MAX_LEASE_DURATION seconds, so the
+# claim can't be in use any longer than that.
+CLAIM_TIMEOUT = int(os.environ.get('MAX_LEASE_DURATION', '600'))
+
+
+def dedup_key(event, message):
+  """Returns the key that identifies an event across deliveries.
+
+  Chat messages have a unique resource name. Other events, such as being added
+  to a space, are identified by their Pub/Sub message ID.
+  """
+  if name := event.get('message', {}).get('name'):
+    return name
+  return 'pubsub/' + message.message_id
+
+
+class LruStore:
+  """Remembers the state of the most recent events in memory."""
+
+  def __init__(self, max_size=DEDUP_CACHE_SIZE, claim_timeout=CLAIM_TIMEOUT):
+    self.max_size = max_size
+    self.claim_timeout = claim_timeout
+    # The state of every event, and the time it was claimed.
+    self.states = collections.OrderedDict()
+    self.lock = threading.Lock()
+
+  def claim(self, key):
+    """Claims an event. Returns CLAIMED, IN_PROGRESS or DONE."""
+    now = time.monotonic()
+    with self.lock:
+      state, claimed_at = self.states.get(key, (None, None))
+      if state == DONE or (
+          state == IN_PROGRESS and now - claimed_at < self.claim_timeout):
+        self.states.move_to_end(key)
+        return state
+      self._set(key, IN_PROGRESS, now)
+      return CLAIMED
+
+  def complete(self, key):
+    """Marks a claimed event as handled."""
+    with self.lock:
+      self._set(key, DONE, None)
+
+  def release(self, key):
+    """Forgets a claimed event, so that it can be claimed again."""
+    with self.lock:
+      self.states.pop(key, None)
+
+  def _set(self, key, state, claimed_at):
+    self.states[key] = (state, claimed_at)
+    self.states.move_to_end(key)
+    while len(self.states) > self.max_size:
+      self.states.popitem(last=False)
+
+
+class FirestoreStore:
+  """Shares the state of events between processes in a Firestore collection.
+
+  Claims are atomic, because documents are created only if they don't exist,
+  and abandoned claims are taken over only if the document didn't change since
+  it was read. Configure a TTL policy on the expireAt field to delete old
+  documents.
+  """
+
+  def __init__(self, collection='chat-events', client=None,
+               claim_timeout=CLAIM_TIMEOUT):
+    # Imported here, since the shared store is optional.
+    from google.api_core import exceptions
+    if client is None:
+      from google.cloud import firestore
+      client = firestore.Client()
+    self.already_exists = exceptions.AlreadyExists
+    self.conflicts = (exceptions.FailedPrecondition, exceptions.NotFound)
+    self.client = client
+    self.collection = client.collection(collection)
+    self.claim_timeout = claim_timeout
+
+  def _document(self, key):
+    # Resource names contain slashes, which aren't allowed in document IDs.
+    return self.collection.document(key.replace('/', ':'))
+
+  def _claim_fields(self):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return {
+        'state': IN_PROGRESS,
+        'claimedAt': now,
+        'expireAt': now + datetime.timedelta(days=DEDUP_TTL_DAYS)}
+
+  def claim(self, key):
+    document = self._document(key)
+    try:
+      document.create(self._claim_fields())
+      return CLAIMED
+    except self.already_exists:
+      pass
+    snapshot = document.get()
+    if not snapshot.exists:
+      return self.claim(key)
+    state = snapshot.get('state')
+    if state != IN_PROGRESS:
+      return state
+    fields = snapshot.to_dict()
+    # Claims stored before claimedAt was added are dated by their expireAt.
+    claimed_at = fields.get('claimedAt') or (
+        fields['expireAt'] - datetime.timedelta(days=DEDUP_TTL_DAYS))
+    age = datetime.datetime.now(datetime.timezone.utc) - claimed_at
+    if age.total_seconds() < self.claim_timeout:
+      return IN_PROGRESS
+    # The claim was abandoned. Take it over, unless another delivery just did.
+    try:
+      document.update(self._claim_fields(), option=self.client.write_option(
+          last_update_time=snapshot.update_time))
+      return CLAIMED
+    except self.conflicts:
+      return IN_PROGRESS
+
+  def complete(self, key):
+    self._document(key).update({'state': DONE})
+
+  def release(self, key):
+    self._document(key).delete()
+
+
+class Deduplicator:
+  """Deduplicates events with an in-memory LRU, backed by an optional shared
+  store so that duplicates delivered to other processes are skipped too.
+
+  Args:
+    shared_store: A store with the same interface as LruStore, or None.
+  """
+
+  def __init__(self, shared_store=None, max_size=DEDUP_CACHE_SIZE):
+    self.local = LruStore(max_size)
+    self.shared = shared_store
+
+  def claim(self, key):
+    """Claims an event. Returns CLAIMED, IN_PROGRESS or DONE."""
+    state = self.local.claim(key)
+    if state != CLAIMED or self.shared is None:
+      return state
+    try:
+      state = self.shared.claim(key)
+    except Exception:
+      # The caller doesn't own the claim when this raises, so release it here
+      # for redeliveries to handle the event.
+      self.local.release(key)
+      raise
+    if state == DONE:
+      self.local.complete(key)
+    elif state == IN_PROGRESS:
+      # Another process is handling the event, check again next time.
+      self.local.release(key)
+    return state
+
+  def complete(self, key):
+    """Marks a claimed event as handled."""
+    self.local.complete(key)
+    if self.shared is not None:
+      self.shared.complete(key)
+
+  def release(self, key):
+    """Forgets a claimed event, so that a redelivery can handle it."""
+    self.local.release(key)
+    if self.shared is not None:
+      self.shared.release(key)
+
+
+def create_deduplicator():
+  """Creates the deduplicator configured by the environment."""
+  if DEDUP_STORE == 'firestore':
+    return Deduplicator(FirestoreStore())
+  if DEDUP_STORE:
+    raise ValueError(f'Unknown DEDUP_STORE: {DEDUP_STORE}')
+  return Deduplicator()
@@ -0,0 +1,132 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Fake Chat API endpoint for load tests, which accepts the messages created by
+the app over REST and counts them. Point the app at it with
+CHAT_API_ENDPOINT=http://localhost:PORT.
+
+Usage:
+  python fake_chat_server.py [--port PORT] [--latency SECONDS]
+"""
+
+import argparse
+import http.server
+import json
+import re
+import threading
+import time
+
+# Path of the create message method of the Chat API.
+CREATE_MESSAGE_PATH = re.compile(r'^/v1/(spaces/[^/]+)/messages(\?.*)?$')
+
+
+class FakeChatServer(http.server.ThreadingHTTPServer):
+  """Answers create message requests after `latency` seconds.
+
+  Args:
+    port: The port to listen on, or 0 for any free port.
+    latency: Seconds to wait before answering, like the real API.
+  """
+
+  daemon_threads = True
+
+  def __init__(self, port=0, latency=0.0):
+    super().__init__(('localhost', port), FakeChatHandler)
+    self.latency = latency
+    self.lock = threading.Lock()
+    self.reset()
+
+  @property
+  def endpoint(self):
+    return f'http://localhost:{self.server_port}'
+
+  def reset(self):
+    """Forgets the messages created so far."""
+    with self.lock:
+      self.posts = 0
+      self.first_post_at = None
+      self.last_post_at = None
+
+  def record_post(self, space_name, message):
+    """Counts a created message. Override to inspect the messages."""
+    now = time.monotonic()
+    with self.lock:
+      self.posts += 1
+      if self.first_post_at is None:
+        self.first_post_at = now
+      self.last_post_at = now
+
+  def throughput(self):
+    """Returns the messages created per second between the first and last."""
+    with self.lock:
+      if self.posts < 2:
+        return 0.0
+      return (self.posts - 1) / (self.last_post_at - self.first_post_at)
+
+  def start(self):
+    """Serves requests on a background thread."""
+    threading.Thread(target=self.serve_forever, daemon=True).start()
+    return self
+
+
+class FakeChatHandler(http.server.BaseHTTPRequestHandler):
+  """Handles the requests of a FakeChatServer."""
+
+  protocol_version = 'HTTP/1.1'
+
+  def do_POST(self):
+    match = CREATE_MESSAGE_PATH.match(self.path)
+    body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+    if not match:
+      self.respond(404, {'error': {'code': 404, 'message': 'Not found'}})
+      return
+    message = json.loads(body or b'{}')
+    if self.server.latency:
+      time.sleep(self.server.latency)
+    self.server.record_post(match.group(1), message)
+    message['name'] = f'{match.group(1)}/messages/fake{self.server.posts}'
+    self.respond(200, message)
+
+  def respond(self, status, body):
+    data = json.dumps(body).encode('utf-8')
+    self.send_response(status)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', str(len(data)))
+    self.end_headers()
+    self.wfile.write(data)
+
+  def log_message(self, format, *args):
+    # Don't log every request.
+    pass
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--port', type=int, default=8086)
+  parser.add_argument('--latency', type=float, default=0.0)
+  args = parser.parse_args()
+
+  server = FakeChatServer(args.port, args.latency).start()
+  print(f'Fake Chat API listening on {server.endpoint}')
+  try:
+    while True:
+      time.sleep(10)
+      print(f'{server.posts} messages created, '
+            f'{server.throughput():,.0f} messages/s')
+  except KeyboardInterrupt:
+    server.shutdown()
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,79 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measures how many CreateMessageRequests per second a single core can build,
+comparing requests built from dictionaries with the request templates of the
+app.
+
+Usage:
+  python format_benchmark.py [--requests N]
+"""
+
+import argparse
+import json
+import time
+from google.apps import chat_v1 as google_chat
+from consumer import format_request
+from decoding import decode_event
+from synthetic_events import synthetic_event
+
+
+def dict_format_request(event):
+  """Builds the request from dictionaries, like the app used to."""
+  space_name = event['space']['name']
+  if event['type'] == 'ADDED_TO_SPACE' and 'message' not in event:
+    return google_chat.CreateMessageRequest(
+        parent = space_name,
+        message = {
+          'text': 'Thank you for adding me!'
+        }
+    )
+  return google_chat.CreateMessageRequest(
+      parent = space_name,
+      message_reply_option = google_chat.CreateMessageRequest.MessageReplyOption.REPLY_MESSAGE_FALLBACK_TO_NEW_THREAD,
+      message = {
+        'text': 'You said: `' + event['message']['text'] + '`',
+        'thread': {
+          'name': event['message']['thread']['name']
+        }
+      }
+  )
+
+
+def measure(handler, events):
+  """Returns the requests built per CPU second."""
+  start = time.process_time()
+  for event in events:
+    handler(event)
+  return len(events) / (time.process_time() - start)
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--requests', type=int, default=50000)
+  args = parser.parse_args()
+
+  for event_type in ('MESSAGE', 'ADDED_TO_SPACE'):
+    events = [
+        decode_event(json.dumps(
+            synthetic_event(event_type, f'space{i % 100}', i)).encode())
+        for i in range(args.requests)]
+    for name, handler in [('dictionaries', dict_format_request),
+                          ('templates', format_request)]:
+      print(f'{event_type} from {name}: '
+            f'{measure(handler, events):,.0f} requests/s per core')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,247 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Load generator for the app, against the Pub/Sub emulator and a fake Chat API
+endpoint.
+
+Runs the app on a new subscription, publishes synthetic events at a target
+rate, or replays the events of a JSON lines file, and reports the latency from
+publishing every event to the fake Chat API receiving its response. Start the
+emulator first, then set PUBSUB_EMULATOR_HOST:
+
+  gcloud beta emulators pubsub start --project=test-project
+  PUBSUB_EMULATOR_HOST=localhost:8085 python load_generator.py --rate 200
+
+The app is configured by the environment, for example PROCESSES or
+CALLBACK_THREADS. Rate limits that aren't set are raised so that they don't
+limit the app.
+
+Usage:
+  python load_generator.py [--rate N] [--duration SECONDS] [--replay FILE]
+"""
+
+import argparse
+import collections
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from google.cloud import pubsub_v1
+from fake_chat_server import FakeChatServer
+from synthetic_events import synthetic_event
+
+# Project used in the emulator.
+PROJECT_ID = 'test-project'
+
+# Topic that the load generator publishes to.
+TOPIC_ID = 'load-generator'
+
+# Share of every type of synthetic event.
+EVENT_MIX = {
+    'MESSAGE': 0.9,
+    'ADDED_TO_SPACE': 0.05,
+    'REMOVED_FROM_SPACE': 0.05,
+}
+
+# Seconds to wait for the app to start and answer the first event.
+STARTUP_TIMEOUT = 60
+
+
+def response_key(event):
+  """Returns the key that matches an event with its response, or None if the
+  app doesn't respond to the event.
+
+  Replies are matched by thread, and thank you messages by space.
+  """
+  if event['type'] == 'REMOVED_FROM_SPACE':
+    return None
+  if 'message' not in event:
+    return event['space']['name']
+  return event['message']['thread']['name']
+
+
+class LatencyChatServer(FakeChatServer):
+  """Fake Chat API that measures the latency from publishing every event to
+  receiving its response."""
+
+  def __init__(self, latency=0.0):
+    self.published = collections.defaultdict(collections.deque)
+    self.latencies = []
+    super().__init__(latency=latency)
+
+  def expect(self, event, published_at):
+    """Records that an event was published, returns whether it has a response."""
+    key = response_key(event)
+    if key is None:
+      return False
+    with self.lock:
+      self.published[key].append(published_at)
+    return True
+
+  def record_post(self, space_name, message):
+    super().record_post(space_name, message)
+    now = time.monotonic()
+    key = message.get('thread', {}).get('name') or space_name
+    with self.lock:
+      published = self.published.get(key)
+      if published:
+        self.latencies.append(now - published.popleft())
+        if not published:
+          del self.published[key]
+
+  def reset(self):
+    super().reset()
+    with self.lock:
+      self.published.clear()
+      self.latencies.clear()
+
+
+def synthetic_events(spaces):
+  """Yields synthetic events of the types in EVENT_MIX."""
+  types = list(EVENT_MIX)
+  weights = list(EVENT_MIX.values())
+  for index in itertools.count():
+    event_type = random.choices(types, weights)[0]
+    yield synthetic_event(event_type, f'space{index % spaces}', index)
+
+
+def replayed_events(path):
+  """Yields the events of a file with one JSON event per line."""
+  with open(path) as f:
+    for line in f:
+      if line.strip():
+        yield json.loads(line)
+
+
+def start_app(subscription_id, server):
+  """Starts the app on the subscription, posting to the fake Chat API."""
+  env = dict(
+      os.environ,
+      PROJECT_ID=PROJECT_ID,
+      SUBSCRIPTION_ID=subscription_id,
+      CHAT_API_ENDPOINT=server.endpoint)
+  for name in ('GLOBAL_RATE', 'GLOBAL_BURST', 'SPACE_RATE', 'SPACE_BURST'):
+    env.setdefault(name, '1000000')
+  return subprocess.Popen([sys.executable, 'consumer.py'], env=env)
+
+
+def wait_for_posts(server, app, posts, timeout):
+  """Waits until the fake Chat API received a number of posts."""
+  deadline = time.monotonic() + timeout
+  while server.posts < posts and time.monotonic() < deadline:
+    if app.poll() is not None:
+      raise RuntimeError(f'The app exited with code {app.returncode}')
+    time.sleep(0.05)
+
+
+def publish(publisher, topic_path, server, events, rate, duration):
+  """Publishes events at a rate.
+
+  Returns the number of events published by type, the number of responses
+  expected, and the seconds spent publishing.
+  """
+  published = collections.Counter()
+  expected = 0
+  publish_futures = []
+  start = time.monotonic()
+  for index, event in enumerate(events):
+    scheduled = start + index / rate
+    if scheduled - start >= duration:
+      break
+    delay = scheduled - time.monotonic()
+    if delay > 0:
+      time.sleep(delay)
+    expected += server.expect(event, time.monotonic())
+    publish_futures.append(publisher.publish(
+        topic_path, json.dumps(event).encode('utf-8')))
+    published[event['type']] += 1
+  for future in publish_futures:
+    future.result()
+  return published, expected, time.monotonic() - start
+
+
+def percentile(ordered, percent):
+  index = min(len(ordered) - 1, len(ordered) * percent // 100)
+  return ordered[index] * 1000
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--rate', type=float, default=100,
+                      help='events published per second')
+  parser.add_argument('--duration', type=float, default=30,
+                      help='seconds to publish events for')
+  parser.add_argument('--spaces', type=int, default=100,
+                      help='number of spaces of the synthetic events')
+  parser.add_argument('--replay', help='file with one JSON event per line')
+  parser.add_argument('--latency', type=float, default=0.05,
+                      help='seconds the fake Chat API takes to answer')
+  parser.add_argument('--drain-timeout', type=float, default=60,
+                      help='seconds to wait for responses after publishing')
+  args = parser.parse_args()
+
+  if 'PUBSUB_EMULATOR_HOST' not in os.environ:
+    sys.exit('Set PUBSUB_EMULATOR_HOST to the address of the emulator.')
+
+  publisher = pubsub_v1.PublisherClient()
+  subscriber = pubsub_v1.SubscriberClient()
+  topic_path = publisher.topic_path(PROJECT_ID, TOPIC_ID)
+  subscription_id = f'{TOPIC_ID}-{int(time.time())}'
+  subscription_path = subscriber.subscription_path(PROJECT_ID, subscription_id)
+  publisher.create_topic(name=topic_path)
+  subscriber.create_subscription(name=subscription_path, topic=topic_path)
+  server = LatencyChatServer(args.latency).start()
+  app = start_app(subscription_id, server)
+
+  try:
+    # Wait for the app to answer a first event, so that its startup time isn't
+    # measured.
+    warmup = synthetic_event('MESSAGE', 'warmup', 0)
+    publisher.publish(topic_path, json.dumps(warmup).encode('utf-8')).result()
+    wait_for_posts(server, app, 1, STARTUP_TIMEOUT)
+    if not server.posts:
+      raise RuntimeError('The app didn\'t answer within '
+                         f'{STARTUP_TIMEOUT} seconds')
+    server.reset()
+
+    events = (replayed_events(args.replay) if args.replay
+              else synthetic_events(args.spaces))
+    published, expected, elapsed = publish(
+        publisher, topic_path, server, events, args.rate, args.duration)
+    wait_for_posts(server, app, expected, args.drain_timeout)
+  finally:
+    app.terminate()
+    app.wait()
+    subscriber.delete_subscription(subscription=subscription_path)
+    publisher.delete_topic(topic=topic_path)
+    server.shutdown()
+
+  total = sum(published.values())
+  print(f'Published {total} events in {elapsed:.1f}s '
+        f'({total / elapsed:,.0f} events/s): {dict(published)}')
+  print(f'Received {server.posts} of {expected} responses '
+        f'({server.throughput():,.0f} responses/s)')
+  if server.latencies:
+    ordered = sorted(server.latencies)
+    print('Publish to create_message latency: '
+          + ', '.join(f'p{p} {percentile(ordered, p):,.1f}ms'
+                      for p in (50, 90, 99))
+          + f', max {ordered[-1] * 1000:,.1f}ms')
+
+
+if __name__ == '__main__':
+  main()
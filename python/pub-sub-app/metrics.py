@@ -0,0 +1,94 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+In-process metrics for the Pub/Sub app, logged periodically.
+"""
+
+import collections
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Number of recent samples kept to compute latency percentiles.
+LATENCY_SAMPLES = 1000
+
+
+class Metrics:
+  """Thread-safe counters, gauges and latency distributions."""
+
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.counters = collections.Counter()
+    self.gauges = collections.Counter()
+    self.latencies = collections.defaultdict(
+        lambda: collections.deque(maxlen=LATENCY_SAMPLES))
+
+  def increment(self, name, value=1):
+    """Adds a value to a counter."""
+    with self.lock:
+      self.counters[name] += value
+
+  def add_to_gauge(self, name, delta):
+    """Adds a delta to a gauge, such as a queue depth."""
+    with self.lock:
+      self.gauges[name] += delta
+
+  def observe(self, name, seconds):
+    """Records a latency sample."""
+    with self.lock:
+      self.latencies[name].append(seconds)
+
+  def summary(self):
+    """Returns the current counters, gauges and latency percentiles."""
+    with self.lock:
+      summary = dict(self.counters)
+      summary.update(self.gauges)
+      for name, samples in self.latencies.items():
+        if not samples:
+          continue
+        ordered = sorted(samples)
+        for percentile in (50, 99):
+          index = min(len(ordered) - 1, len(ordered) * percentile // 100)
+          summary[f'{name}_p{percentile}_ms'] = round(ordered[index] * 1000, 1)
+      return summary
+
+
+class MeteredThreadPoolExecutor(ThreadPoolExecutor):
+  """Thread pool that reports how many tasks wait for a thread, and how long.
+
+  Args:
+    metrics: The metrics to report to.
+    name: The prefix of the reported metric names.
+  """
+
+  def __init__(self, metrics, name, max_workers):
+    super().__init__(max_workers=max_workers, thread_name_prefix=name)
+    self.metrics = metrics
+    self.name = name
+
+  def submit(self, fn, /, *args, **kwargs):
+    submitted = time.monotonic()
+    self.metrics.add_to_gauge(f'{self.name}_queue_depth', 1)
+
+    def run():
+      self.metrics.add_to_gauge(f'{self.name}_queue_depth', -1)
+      self.metrics.observe(f'{self.name}_queue_wait', time.monotonic() - submitted)
+      return fn(*args, **kwargs)
+
+    try:
+      return super().submit(run)
+    except RuntimeError:
+      # The executor is shut down.
+      self.metrics.add_to_gauge(f'{self.name}_queue_depth', -1)
+      raise
@@ -0,0 +1,125 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measures how the app's throughput scales with the number of processes, against
+the Pub/Sub emulator and a fake Chat API endpoint.
+
+For every process count, publishes synthetic events to a new subscription,
+runs the app with PROCESSES set to that count, and reports the messages posted
+per second. Start the emulator first, then set PUBSUB_EMULATOR_HOST:
+
+  gcloud beta emulators pubsub start --project=test-project
+  PUBSUB_EMULATOR_HOST=localhost:8085 python scaling_benchmark.py
+
+Usage:
+  python scaling_benchmark.py [--messages N] [--processes 1 2 4]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from google.api_core import exceptions
+from google.cloud import pubsub_v1
+from fake_chat_server import FakeChatServer
+from synthetic_events import synthetic_event
+
+# Project used in the emulator.
+PROJECT_ID = 'test-project'
+
+# Topic that the benchmark publishes to.
+TOPIC_ID = 'scaling-benchmark'
+
+# Seconds to wait for the app to post every message.
+RUN_TIMEOUT = 300
+
+
+def publish(publisher, topic_path, messages, spaces):
+  """Publishes synthetic MESSAGE events spread across spaces."""
+  publish_futures = [
+      publisher.publish(topic_path, json.dumps(
+          synthetic_event('MESSAGE', f'space{i % spaces}', i)).encode('utf-8'))
+      for i in range(messages)]
+  for future in publish_futures:
+    future.result()
+
+
+def run_app(processes, subscription_id, server, messages):
+  """Runs the app until it posted every message, and returns messages/s."""
+  env = dict(
+      os.environ,
+      PROJECT_ID=PROJECT_ID,
+      SUBSCRIPTION_ID=subscription_id,
+      PROCESSES=str(processes),
+      CHAT_API_ENDPOINT=server.endpoint,
+      # Rate limits high enough to measure the app, not the limits.
+      GLOBAL_RATE='1000000',
+      GLOBAL_BURST='1000000',
+      SPACE_RATE='1000000',
+      SPACE_BURST='1000000',
+      METRICS_INTERVAL='3600')
+  server.reset()
+  app = subprocess.Popen([sys.executable, 'consumer.py'], env=env)
+  try:
+    deadline = time.monotonic() + RUN_TIMEOUT
+    while server.posts < messages:
+      if time.monotonic() > deadline or app.poll() is not None:
+        raise RuntimeError(
+            f'Only {server.posts} of {messages} messages were posted')
+      time.sleep(0.1)
+    return server.throughput()
+  finally:
+    app.terminate()
+    app.wait()
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--messages', type=int, default=20000)
+  parser.add_argument('--spaces', type=int, default=100)
+  parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4])
+  parser.add_argument('--latency', type=float, default=0.05,
+                      help='seconds the fake Chat API takes to answer')
+  args = parser.parse_args()
+
+  if 'PUBSUB_EMULATOR_HOST' not in os.environ:
+    sys.exit('Set PUBSUB_EMULATOR_HOST to the address of the emulator.')
+
+  publisher = pubsub_v1.PublisherClient()
+  subscriber = pubsub_v1.SubscriberClient()
+  topic_path = publisher.topic_path(PROJECT_ID, TOPIC_ID)
+  try:
+    publisher.create_topic(name=topic_path)
+  except exceptions.AlreadyExists:
+    pass
+  server = FakeChatServer(latency=args.latency).start()
+
+  for processes in args.processes:
+    subscription_id = f'{TOPIC_ID}-{processes}-{int(time.time())}'
+    subscription_path = subscriber.subscription_path(
+        PROJECT_ID, subscription_id)
+    subscriber.create_subscription(name=subscription_path, topic=topic_path)
+    publish(publisher, topic_path, args.messages, args.spaces)
+    throughput = run_app(processes, subscription_id, server, args.messages)
+    subscriber.delete_subscription(subscription=subscription_path)
+    print(f'{processes} processes: {throughput:,.0f} messages/s')
+
+  publisher.delete_topic(topic=topic_path)
+  server.shutdown()
+
+
+if __name__ == '__main__':
+  main()
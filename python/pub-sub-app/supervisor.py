@@ -0,0 +1,132 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Supervisor that runs the app in several worker processes, selected with
+PROCESSES greater than 1, so that the app isn't limited to one core by the GIL.
+
+Every worker pulls from the same subscription with its own subscriber and Chat
+client. The supervisor restarts workers that exit, and stops them on SIGINT or
+SIGTERM.
+"""
+
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import chat_writer
+from consumer import LOG_FORMAT, SHUTDOWN_TIMEOUT
+
+# Seconds between health checks of the workers.
+HEALTH_CHECK_INTERVAL = 5
+
+# Workers that exit sooner than this many seconds after starting are restarted
+# with an increasing delay, to avoid restarting a broken worker in a loop.
+MIN_UPTIME = 30
+
+# Upper bound in seconds for the delay before restarting a worker.
+MAX_RESTART_DELAY = 60
+
+# Seconds that workers have to stop after finishing their messages, which
+# takes up to SHUTDOWN_TIMEOUT seconds.
+SHUTDOWN_GRACE = 10
+
+
+def run_worker():
+  """Entry point of the worker processes."""
+  logging.basicConfig(level=logging.INFO, style='{', format=LOG_FORMAT)
+  import consumer
+  consumer.run()
+
+
+class Worker:
+  """A worker process and its restart state."""
+
+  def __init__(self, context, index):
+    self.context = context
+    self.index = index
+    self.failures = 0
+    self.restart_at = None
+    self.start()
+
+  def start(self):
+    self.process = self.context.Process(
+        target=run_worker, name=f'worker-{self.index}')
+    self.process.start()
+    self.started_at = time.monotonic()
+    self.restart_at = None
+    logging.info('Started worker %d with pid %d', self.index, self.process.pid)
+
+  def check(self, now):
+    """Restarts the worker if it exited, after a delay if it keeps failing."""
+    if self.process.is_alive():
+      return
+    if self.restart_at is None:
+      uptime = now - self.started_at
+      logging.warning('Worker %d exited with code %s after %.0fs',
+                      self.index, self.process.exitcode, uptime)
+      self.failures = self.failures + 1 if uptime < MIN_UPTIME else 0
+      delay = min(MAX_RESTART_DELAY, 2 ** self.failures - 1)
+      self.restart_at = now + delay
+    if now >= self.restart_at:
+      self.start()
+
+
+def worker_limits(processes):
+  """Returns the rate limits of every worker, as environment variables.
+
+  The Chat API rate limits apply to the whole app, and Pub/Sub delivers the
+  events of a space to any worker, so the rates are split between the workers.
+  Bursts are split too, but never below 1, since a token bucket with a burst
+  below 1 never has a whole token to take.
+  """
+  return {
+      'GLOBAL_RATE': str(chat_writer.GLOBAL_RATE / processes),
+      'GLOBAL_BURST': str(max(1, chat_writer.GLOBAL_BURST / processes)),
+      'SPACE_RATE': str(chat_writer.SPACE_RATE / processes),
+      'SPACE_BURST': str(max(1, chat_writer.SPACE_BURST / processes)),
+  }
+
+
+def supervise(processes):
+  """Runs the app in worker processes until SIGINT or SIGTERM."""
+  # Workers read their rate limits from the environment when they start.
+  os.environ.update(worker_limits(processes))
+
+  stopping = threading.Event()
+  signal.signal(signal.SIGINT, lambda signum, frame: stopping.set())
+  signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+
+  # gRPC doesn't support forking a process that uses it, so workers are
+  # spawned as fresh interpreters.
+  context = multiprocessing.get_context('spawn')
+  workers = [Worker(context, index) for index in range(processes)]
+  while not stopping.wait(HEALTH_CHECK_INTERVAL):
+    now = time.monotonic()
+    for worker in workers:
+      worker.check(now)
+
+  # Ask the workers to stop, and kill the ones that don't stop in time.
+  logging.info('Stopping %d workers', len(workers))
+  for worker in workers:
+    if worker.process.is_alive():
+      worker.process.terminate()
+  deadline = time.monotonic() + SHUTDOWN_TIMEOUT + SHUTDOWN_GRACE
+  for worker in workers:
+    worker.process.join(max(0, deadline - time.monotonic()))
+    if worker.process.is_alive():
+      logging.warning('Killing worker %d', worker.index)
+      worker.process.kill()
+      worker.process.join()
@@ -0,0 +1,78 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Synthetic Chat events with the shape of the events sent through Pub/Sub, for
+benchmarks and load tests.
+"""
+
+import datetime
+
+
+def synthetic_event(event_type, space_id, index):
+  """Returns a Chat event of the given type.
+
+  Args:
+    event_type: MESSAGE, ADDED_TO_SPACE or REMOVED_FROM_SPACE.
+    space_id: The ID of the space of the event.
+    index: A number that makes the message and thread names unique.
+  """
+  now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+  space_name = f'spaces/{space_id}'
+  user = {
+      'name': f'users/{100000 + index % 1000}',
+      'displayName': f'Load Tester {index % 1000}',
+      'avatarUrl': 'https://lh3.googleusercontent.com/a/default-user',
+      'email': f'tester{index % 1000}@example.com',
+      'type': 'HUMAN',
+      'domainId': 'example'
+  }
+  event = {
+      'type': event_type,
+      'eventTime': now,
+      'space': {
+          'name': space_name,
+          'type': 'ROOM',
+          'displayName': f'Load test space {space_id}',
+          'spaceThreadingState': 'THREADED_MESSAGES',
+          'spaceType': 'SPACE',
+          'spaceHistoryState': 'HISTORY_ON'
+      },
+      'user': user
+  }
+  if event_type == 'MESSAGE':
+    text = f'@App hello from the load test, message {index}'
+    event['message'] = {
+        'name': f'{space_name}/messages/m{index}',
+        'sender': user,
+        'createTime': now,
+        'text': text,
+        'argumentText': text[len('@App'):],
+        'formattedText': text,
+        'annotations': [{
+            'type': 'USER_MENTION',
+            'startIndex': 0,
+            'length': 4,
+            'userMention': {
+                'user': {
+                    'name': 'users/app',
+                    'displayName': 'App',
+                    'type': 'BOT'
+                },
+                'type': 'MENTION'
+            }
+        }],
+        'thread': {'name': f'{space_name}/threads/t{index}'},
+        'space': {'name': space_name}
+    }
+  return event
@@ -0,0 +1,117 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+import unittest
+from concurrent import futures
+from unittest import mock
+
+# Import the module under test
+import async_app
+import chat_writer
+import consumer
+from fake_chat_server import FakeChatServer
+from google.api_core.exceptions import NotFound
+from google.apps import chat_v1 as google_chat
+from metrics import Metrics
+
+
+class CreateAsyncChatClientTest(unittest.TestCase):
+
+  def setUp(self):
+    self.server = FakeChatServer().start()
+    self.addCleanup(self.server.server_close)
+    self.addCleanup(self.server.shutdown)
+    for module in (async_app, consumer):
+      patcher = mock.patch.object(
+          module, 'CHAT_API_ENDPOINT', self.server.endpoint)
+      patcher.start()
+      self.addCleanup(patcher.stop)
+
+  def testPostsToChatApiEndpointWithoutCredentials(self):
+    chat = async_app.create_async_chat_client()
+    request = google_chat.CreateMessageRequest(
+        parent='spaces/AAA', message={'text': 'Hello'})
+
+    message = asyncio.run(chat.create_message(request))
+
+    self.assertEqual(message.name, 'spaces/AAA/messages/fake1')
+    self.assertEqual(self.server.posts, 1)
+
+
+class FakeAsyncChat:
+  """Records the posted requests, after a short delay."""
+
+  def __init__(self):
+    self.posted = []
+
+  async def create_message(self, request):
+    await asyncio.sleep(0.001)
+    self.posted.append(request)
+
+
+class AsyncChatWriterTest(unittest.TestCase):
+  SPACES = 5
+  MESSAGES = 40
+
+  def setUp(self):
+    for name in ('SPACE_BURST', 'GLOBAL_BURST'):
+      patcher = mock.patch.object(chat_writer, name, 1000)
+      patcher.start()
+      self.addCleanup(patcher.stop)
+
+  def testPostsInOrderWithinSpaceAndDropsIdleLocks(self):
+    chat = FakeAsyncChat()
+    requests = [
+        google_chat.CreateMessageRequest(
+            parent=f'spaces/{i % self.SPACES}', message={'text': str(i)})
+        for i in range(self.MESSAGES)]
+
+    async def post_all():
+      writer = async_app.AsyncChatWriter(chat, Metrics())
+      await asyncio.gather(*(writer.post(request) for request in requests))
+      return writer
+
+    writer = asyncio.run(post_all())
+
+    for i in range(self.SPACES):
+      space_name = f'spaces/{i}'
+      self.assertEqual(
+          [r for r in chat.posted if r.parent == space_name],
+          [r for r in requests if r.parent == space_name])
+    self.assertEqual(writer.space_locks, {})
+    self.assertEqual(writer.space_waiters, {})
+
+
+class ReceiveMessagesTest(unittest.TestCase):
+
+  def setUp(self):
+    self.streaming_pull_future = futures.Future()
+    subscriber = mock.Mock()
+    subscriber.subscribe.return_value = self.streaming_pull_future
+    for patcher in [
+        mock.patch.object(async_app.pubsub_v1, 'SubscriberClient',
+                          return_value=subscriber),
+        mock.patch.object(async_app, 'create_async_chat_client')]:
+      patcher.start()
+      self.addCleanup(patcher.stop)
+
+  def testRaisesWhenSubscriptionFails(self):
+    error = NotFound('Subscription does not exist')
+    threading.Timer(
+        0.1, self.streaming_pull_future.set_exception, [error]).start()
+
+    with self.assertRaises(NotFound):
+      asyncio.run(async_app.receive_messages())
@@ -0,0 +1,128 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import threading
+import time
+import unittest
+from typing import NamedTuple
+from google.api_core import exceptions
+
+# Import the module under test
+from chat_writer import ChatWriter, SpaceBuckets
+from metrics import Metrics
+
+
+class FakeRequest(NamedTuple):
+  parent: str
+  text: str
+
+
+class FakeChat:
+  """Records the posted requests, after a random delay and retryable errors."""
+
+  def __init__(self, error_rate=0.0):
+    self.error_rate = error_rate
+    self.posted = []
+    self.lock = threading.Lock()
+
+  def create_message(self, request):
+    time.sleep(random.uniform(0, 0.002))
+    if random.random() < self.error_rate:
+      raise exceptions.TooManyRequests('Slow down')
+    with self.lock:
+      self.posted.append(request)
+
+
+class ChatWriterTest(unittest.TestCase):
+  SPACES = 5
+  MESSAGES = 40
+
+  def post_all(self, chat, order_by_space=True):
+    writer = ChatWriter(chat, Metrics(), threads=8, space_burst=1000,
+                        global_burst=1000, space_rate=1000, global_rate=1000,
+                        initial_backoff=0.001, max_attempts=100,
+                        order_by_space=order_by_space)
+    writer.start()
+    self.writer = writer
+    done = threading.Semaphore(0)
+    requests = [FakeRequest(f'spaces/{i % self.SPACES}', str(i))
+                for i in range(self.MESSAGES)]
+    for request in requests:
+      writer.submit(request, on_success=done.release,
+                    on_failure=lambda error: done.release())
+    for _ in requests:
+      self.assertTrue(done.acquire(timeout=10))
+    return requests
+
+  def testPostsInOrderWithinSpace(self):
+    chat = FakeChat(error_rate=0.3)
+
+    requests = self.post_all(chat)
+
+    for i in range(self.SPACES):
+      space_name = f'spaces/{i}'
+      self.assertEqual(
+          [r for r in chat.posted if r.parent == space_name],
+          [r for r in requests if r.parent == space_name])
+
+  def testSpacesArePostedInParallel(self):
+    blocked = threading.Event()
+    released = threading.Event()
+
+    class BlockingChat(FakeChat):
+      def create_message(self, request):
+        # Block the first space until another space posted.
+        if request.parent == 'spaces/0' and not blocked.is_set():
+          blocked.set()
+          released.wait(5)
+        super().create_message(request)
+        if request.parent != 'spaces/0':
+          released.set()
+
+    chat = BlockingChat()
+
+    self.post_all(chat)
+
+    self.assertEqual(len(chat.posted), self.MESSAGES)
+    self.assertNotEqual(chat.posted[0].parent, 'spaces/0')
+
+
+  def testDropsEmptyLanes(self):
+    self.post_all(FakeChat())
+
+    # The last lane of a space is dropped right after its callback returns.
+    deadline = time.monotonic() + 5
+    while self.writer.lanes and time.monotonic() < deadline:
+      time.sleep(0.01)
+    self.assertEqual(self.writer.lanes, {})
+
+
+class SpaceBucketsTest(unittest.TestCase):
+
+  def testDropsRefilledBuckets(self):
+    buckets = SpaceBuckets(rate=1, burst=2, sweep_interval=10)
+    now = time.monotonic()
+    buckets.get('spaces/idle', now).take()
+    buckets.get('spaces/busy', now).take()
+
+    # The idle space refilled by the next sweep, the busy one posted again.
+    busy = buckets.get('spaces/busy', now + 9)
+    busy.wait_time(now + 9)
+    busy.take()
+    busy.take()
+    buckets.get('spaces/other', now + 10)
+
+    self.assertEqual(sorted(buckets.buckets), ['spaces/busy', 'spaces/other'])
+    self.assertIs(buckets.get('spaces/busy', now + 10), busy)
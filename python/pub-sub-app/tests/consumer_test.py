@@ -0,0 +1,189 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import unittest
+from google.api_core import exceptions
+from google.apps import chat_v1 as google_chat
+
+# Import the module under test
+import consumer
+import dead_letter
+from chat_writer import ChatWriter
+from dedup import Deduplicator
+from dedup_test import FakeChat, FakeMessage
+from metrics import Metrics
+
+
+class BlockingChat(FakeChat):
+  """Holds every post until it is released."""
+
+  def __init__(self):
+    super().__init__()
+    self.released = threading.Event()
+
+  def create_message(self, request):
+    self.released.wait(5)
+    super().create_message(request)
+
+
+class FailingChat(FakeChat):
+  """Fails every post with an error."""
+
+  def __init__(self, error):
+    super().__init__()
+    self.error = error
+
+  def create_message(self, request):
+    raise self.error
+
+
+class FakeSink:
+  """Records the dead letters."""
+
+  def __init__(self):
+    self.letters = []
+
+  def send(self, message, error_class, error):
+    self.letters.append((message.message_id, error_class))
+
+
+EVENT = {
+    'type': 'MESSAGE',
+    'space': {'name': 'spaces/AAA'},
+    'message': {
+        'name': 'spaces/AAA/messages/BBB',
+        'text': 'Hello',
+        'thread': {'name': 'spaces/AAA/threads/CCC'}
+    }
+}
+
+
+class ShutdownTest(unittest.TestCase):
+
+  def setUp(self):
+    self.metrics = Metrics()
+    self.in_flight = consumer.InFlightMessages()
+
+  def create_callback(self, chat):
+    writer = ChatWriter(chat, self.metrics, threads=2)
+    writer.start()
+    return consumer.create_callback(
+        writer, Deduplicator(), self.metrics, self.in_flight)
+
+  def testDrainWaitsForMessagesInFlight(self):
+    chat = BlockingChat()
+    callback = self.create_callback(chat)
+    message = FakeMessage(EVENT)
+    callback(message)
+
+    self.assertEqual(self.in_flight.drain(0.01), 1)
+    chat.released.set()
+
+    self.assertEqual(self.in_flight.drain(5), 0)
+    self.assertEqual(message.result, 'ack')
+
+  def testMessagesReceivedWhileDrainingAreHeldThenNacked(self):
+    chat = FakeChat()
+    callback = self.create_callback(chat)
+    self.in_flight.drain(0)
+    message = FakeMessage(EVENT)
+
+    callback(message)
+
+    self.assertIsNone(message.result)
+    self.assertEqual(chat.requests, [])
+    self.assertEqual(self.metrics.summary()['shutdown_held'], 1)
+    self.assertEqual(self.in_flight.nack_held(), 1)
+    self.assertEqual(message.result, 'nack')
+    self.assertEqual(self.in_flight.nack_held(), 0)
+
+
+class PoisonMessageTest(unittest.TestCase):
+
+  def setUp(self):
+    self.metrics = Metrics()
+    self.sink = FakeSink()
+
+  def deliver(self, chat, message):
+    writer = ChatWriter(chat, self.metrics, threads=1, max_attempts=1)
+    writer.start()
+    callback = consumer.create_callback(
+        writer, Deduplicator(), self.metrics, dead_letter_sink=self.sink)
+    callback(message)
+    self.assertTrue(message.done.wait(5))
+    return message.result
+
+  def testInvalidPayloadIsDeadLettered(self):
+    message = FakeMessage(EVENT)
+    message.data = b'not json'
+
+    self.assertEqual(self.deliver(FakeChat(), message), 'ack')
+    self.assertEqual(self.sink.letters, [('1', dead_letter.INVALID_PAYLOAD)])
+    self.assertEqual(self.metrics.summary()['error_invalid_payload'], 1)
+
+  def testMessageWithoutThreadIsDeadLettered(self):
+    event = {'type': 'MESSAGE', 'space': {'name': 'spaces/AAA'},
+             'message': {'name': 'spaces/AAA/messages/BBB', 'text': 'Hello'}}
+    chat = FakeChat()
+
+    self.assertEqual(self.deliver(chat, FakeMessage(event)), 'ack')
+    self.assertEqual(self.sink.letters, [('1', dead_letter.MALFORMED_EVENT)])
+    self.assertEqual(chat.requests, [])
+
+  def testRejectedPostIsDeadLettered(self):
+    chat = FailingChat(exceptions.NotFound('Space not found'))
+
+    self.assertEqual(self.deliver(chat, FakeMessage(EVENT)), 'ack')
+    self.assertEqual(self.sink.letters, [('1', dead_letter.CHAT_REJECTED)])
+    self.assertEqual(self.metrics.summary()['error_chat_rejected'], 1)
+
+  def testUnavailableChatIsRetriedLater(self):
+    chat = FailingChat(exceptions.TooManyRequests('Slow down'))
+    message = FakeMessage(EVENT)
+    message.delivery_attempt = 3
+
+    self.assertEqual(self.deliver(chat, message), 'retry')
+    self.assertEqual(message.ack_deadline, 4 * consumer.RETRY_DELAY)
+    self.assertEqual(self.sink.letters, [])
+    self.assertEqual(self.metrics.summary()['error_chat_unavailable'], 1)
+
+
+class FormatRequestTest(unittest.TestCase):
+
+  def testReplyFromTemplate(self):
+    request = consumer.format_request(EVENT)
+
+    self.assertEqual(request, google_chat.CreateMessageRequest(
+        parent = 'spaces/AAA',
+        message_reply_option = google_chat.CreateMessageRequest.MessageReplyOption.REPLY_MESSAGE_FALLBACK_TO_NEW_THREAD,
+        message = {
+          'text': 'You said: `Hello`',
+          'thread': {'name': 'spaces/AAA/threads/CCC'}
+        }))
+
+  def testThankYouFromTemplate(self):
+    event = {'type': 'ADDED_TO_SPACE', 'space': {'name': 'spaces/AAA'}}
+
+    request = consumer.format_request(event)
+
+    self.assertEqual(request, google_chat.CreateMessageRequest(
+        parent = 'spaces/AAA',
+        message = {'text': 'Thank you for adding me!'}))
+
+  def testTemplatesAreNotModified(self):
+    consumer.format_request(EVENT)
+
+    self.assertEqual(consumer.REPLY_TEMPLATE.parent, '')
+    self.assertEqual(consumer.REPLY_TEMPLATE.message.text, '')
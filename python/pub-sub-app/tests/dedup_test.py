@@ -0,0 +1,312 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import datetime
+import json
+import threading
+import unittest
+from google.api_core import exceptions
+
+# Import the module under test
+import consumer
+from chat_writer import ChatWriter
+from dedup import (CLAIMED, DONE, IN_PROGRESS, Deduplicator, FirestoreStore,
+                   LruStore)
+from metrics import Metrics
+
+
+class FakeChat:
+  """Records the posted requests, optionally failing the first ones."""
+
+  def __init__(self, failures=0):
+    self.failures = failures
+    self.requests = []
+    self.lock = threading.Lock()
+
+  def create_message(self, request):
+    with self.lock:
+      if self.failures:
+        self.failures -= 1
+        raise ValueError('Permanent failure')
+      self.requests.append(request)
+
+
+class FakeMessage:
+  """A Pub/Sub message that records whether it was acked, nacked, or dropped
+  to be redelivered after its ack deadline."""
+
+  def __init__(self, event, message_id='1'):
+    self.data = json.dumps(event).encode('utf-8')
+    self.message_id = message_id
+    self.delivery_attempt = None
+    self.ack_deadline = None
+    self.publish_time = datetime.datetime.now(datetime.timezone.utc)
+    self.done = threading.Event()
+    self.result = None
+
+  def ack(self):
+    self.result = 'ack'
+    self.done.set()
+
+  def nack(self):
+    self.result = 'nack'
+    self.done.set()
+
+  def modify_ack_deadline(self, seconds):
+    self.ack_deadline = seconds
+
+  def drop(self):
+    self.result = 'retry'
+    self.done.set()
+
+
+class DedupTest(unittest.TestCase):
+  REPLAYS = 50
+
+  EVENT = {
+      'type': 'MESSAGE',
+      'space': {'name': 'spaces/AAA'},
+      'message': {
+          'name': 'spaces/AAA/messages/BBB',
+          'text': 'Hello',
+          'thread': {'name': 'spaces/AAA/threads/CCC'}
+      }
+  }
+
+  def setUp(self):
+    self.metrics = Metrics()
+
+  def create_callback(self, chat):
+    writer = ChatWriter(chat, self.metrics, threads=4, space_burst=100)
+    writer.start()
+    return consumer.create_callback(writer, Deduplicator(), self.metrics)
+
+  def deliver(self, callback, message):
+    callback(message)
+    self.assertTrue(message.done.wait(5))
+    return message.result
+
+  def testReplayedEventIsPostedOnce(self):
+    chat = FakeChat()
+    callback = self.create_callback(chat)
+
+    results = [self.deliver(callback, FakeMessage(self.EVENT, str(i)))
+               for i in range(self.REPLAYS)]
+
+    self.assertEqual(len(chat.requests), 1)
+    self.assertEqual(results, ['ack'] * self.REPLAYS)
+    self.assertEqual(self.metrics.summary()['duplicate'], self.REPLAYS - 1)
+
+  def testConcurrentReplaysArePostedOnce(self):
+    chat = FakeChat()
+    callback = self.create_callback(chat)
+    messages = [FakeMessage(self.EVENT, str(i)) for i in range(self.REPLAYS)]
+
+    threads = [threading.Thread(target=callback, args=(message,))
+               for message in messages]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    for message in messages:
+      self.assertTrue(message.done.wait(5))
+
+    self.assertEqual(len(chat.requests), 1)
+
+  def testFailedEventIsPostedOnRedelivery(self):
+    chat = FakeChat(failures=1)
+    callback = self.create_callback(chat)
+
+    self.assertEqual(self.deliver(callback, FakeMessage(self.EVENT)), 'retry')
+    self.assertEqual(self.deliver(callback, FakeMessage(self.EVENT)), 'ack')
+    self.assertEqual(self.deliver(callback, FakeMessage(self.EVENT)), 'ack')
+
+    self.assertEqual(len(chat.requests), 1)
+
+  def testEventsWithoutMessageUsePubSubMessageId(self):
+    chat = FakeChat()
+    callback = self.create_callback(chat)
+    event = {'type': 'ADDED_TO_SPACE', 'space': {'name': 'spaces/AAA'}}
+
+    self.deliver(callback, FakeMessage(event, '1'))
+    self.deliver(callback, FakeMessage(event, '1'))
+    self.deliver(callback, FakeMessage(event, '2'))
+
+    self.assertEqual(len(chat.requests), 2)
+
+
+class LruStoreTest(unittest.TestCase):
+
+  def testClaimCompleteRelease(self):
+    store = LruStore()
+
+    self.assertEqual(store.claim('a'), CLAIMED)
+    self.assertEqual(store.claim('a'), IN_PROGRESS)
+    store.release('a')
+    self.assertEqual(store.claim('a'), CLAIMED)
+    store.complete('a')
+    self.assertEqual(store.claim('a'), DONE)
+
+  def testEvictsLeastRecentlyUsed(self):
+    store = LruStore(max_size=2)
+
+    store.claim('a')
+    store.claim('b')
+    store.claim('a')
+    store.claim('c')
+
+    self.assertEqual(store.claim('a'), IN_PROGRESS)
+    self.assertEqual(store.claim('b'), CLAIMED)
+
+  def testTakesOverAbandonedClaim(self):
+    store = LruStore(claim_timeout=0)
+
+    self.assertEqual(store.claim('a'), CLAIMED)
+    self.assertEqual(store.claim('a'), CLAIMED)
+    store.complete('a')
+    self.assertEqual(store.claim('a'), DONE)
+
+
+class FailingStore:
+  """A shared store that fails to claim the first events."""
+
+  def __init__(self, failures):
+    self.failures = failures
+    self.store = LruStore()
+
+  def claim(self, key):
+    if self.failures:
+      self.failures -= 1
+      raise exceptions.DeadlineExceeded('Firestore timed out')
+    return self.store.claim(key)
+
+  def complete(self, key):
+    self.store.complete(key)
+
+  def release(self, key):
+    self.store.release(key)
+
+
+class DeduplicatorTest(unittest.TestCase):
+
+  def testSharedClaimErrorReleasesLocalClaim(self):
+    deduplicator = Deduplicator(FailingStore(failures=1))
+
+    with self.assertRaises(exceptions.DeadlineExceeded):
+      deduplicator.claim('a')
+    self.assertEqual(deduplicator.claim('a'), CLAIMED)
+    deduplicator.complete('a')
+    self.assertEqual(deduplicator.claim('a'), DONE)
+
+
+class FakeSnapshot:
+  """A Firestore document snapshot."""
+
+  def __init__(self, fields, update_time):
+    self.exists = fields is not None
+    self.fields = fields
+    self.update_time = update_time
+
+  def get(self, field):
+    return self.fields[field]
+
+  def to_dict(self):
+    return dict(self.fields)
+
+
+class FakeDocument:
+  """A Firestore document that supports create, update preconditions and
+  delete."""
+
+  def __init__(self):
+    self.fields = None
+    self.update_time = 0
+
+  def create(self, fields):
+    if self.fields is not None:
+      raise exceptions.AlreadyExists('Document exists')
+    self._write(fields)
+
+  def get(self):
+    return FakeSnapshot(self.fields, self.update_time)
+
+  def update(self, fields, option=None):
+    if self.fields is None:
+      raise exceptions.NotFound('No document')
+    if option is not None and option != self.update_time:
+      raise exceptions.FailedPrecondition('Document changed')
+    self._write(dict(self.fields, **fields))
+
+  def delete(self):
+    self.fields = None
+
+  def _write(self, fields):
+    self.fields = fields
+    self.update_time += 1
+
+
+class FakeFirestore:
+  """A Firestore client with a single collection."""
+
+  def __init__(self):
+    self.documents = collections.defaultdict(FakeDocument)
+
+  def collection(self, name):
+    return self
+
+  def document(self, document_id):
+    return self.documents[document_id]
+
+  def write_option(self, last_update_time):
+    return last_update_time
+
+
+class FirestoreStoreTest(unittest.TestCase):
+
+  def setUp(self):
+    self.client = FakeFirestore()
+
+  def testClaimInProgressAndDone(self):
+    store = FirestoreStore(client=self.client)
+
+    self.assertEqual(store.claim('spaces/A/messages/B'), CLAIMED)
+    self.assertEqual(store.claim('spaces/A/messages/B'), IN_PROGRESS)
+    store.complete('spaces/A/messages/B')
+    self.assertEqual(store.claim('spaces/A/messages/B'), DONE)
+
+  def testTakesOverAbandonedClaim(self):
+    store = FirestoreStore(client=self.client)
+    store.claim('a')
+    document = self.client.document('a')
+    document.fields['claimedAt'] -= datetime.timedelta(
+        seconds=store.claim_timeout + 1)
+
+    self.assertEqual(store.claim('a'), CLAIMED)
+    self.assertEqual(store.claim('a'), IN_PROGRESS)
+
+  def testOnlyOneDeliveryTakesOverAClaim(self):
+    store = FirestoreStore(client=self.client, claim_timeout=0)
+    store.claim('a')
+    document = self.client.document('a')
+    snapshot = document.get
+
+    def get_then_take_over():
+      # Another delivery takes the claim over between the read and the update.
+      result = snapshot()
+      document._write(dict(document.fields))
+      return result
+
+    document.get = get_then_take_over
+    self.assertEqual(store.claim('a'), IN_PROGRESS)
@@ -0,0 +1,49 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+# Import the module under test
+import supervisor
+from chat_writer import TokenBucket
+
+
+class WorkerLimitsTest(unittest.TestCase):
+
+  def testRatesAreSplitBetweenWorkers(self):
+    limits = supervisor.worker_limits(2)
+
+    self.assertEqual(float(limits['GLOBAL_RATE']),
+                     supervisor.chat_writer.GLOBAL_RATE / 2)
+    self.assertEqual(float(limits['SPACE_RATE']),
+                     supervisor.chat_writer.SPACE_RATE / 2)
+    self.assertEqual(float(limits['GLOBAL_BURST']),
+                     supervisor.chat_writer.GLOBAL_BURST / 2)
+
+  def testBurstsAreAtLeastOne(self):
+    limits = supervisor.worker_limits(1000)
+
+    self.assertEqual(float(limits['GLOBAL_BURST']), 1)
+    self.assertEqual(float(limits['SPACE_BURST']), 1)
+
+  def testSplitSpaceLimitLetsPostsThrough(self):
+    limits = supervisor.worker_limits(8)
+    bucket = TokenBucket(float(limits['SPACE_RATE']),
+                         float(limits['SPACE_BURST']))
+
+    self.assertEqual(bucket.wait_time(bucket.updated), 0)
+    bucket.take()
+    self.assertGreater(bucket.wait_time(bucket.updated), 0)
+    self.assertEqual(bucket.wait_time(bucket.updated + 1 / bucket.rate), 0)
+
@@ -12,9 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Functions to handle database operations."""
+"""Firestore backend of the token store."""
 
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from google.cloud import firestore
+from token_store import TokenStore
 
 # The prefix used by the Google Chat API in the User resource name.
 USERS_PREFIX = "users/"
@@ -22,17 +25,89 @@ USERS_PREFIX = "users/"
 # The name of the users collection in the database.
 USERS_COLLECTION = "users"
 
-# Initialize the Firestore database using Application Default Credentials.
-db = firestore.Client(database="auth-data")
+# The name of the Firestore database.
+DATABASE = "auth-data"
 
-def store_token(user_name: str, access_token: str, refresh_token: str):
-    """Saves the user's OAuth2 tokens to storage."""
-    doc_ref = db.collection(USERS_COLLECTION).document(user_name.replace(USERS_PREFIX, ""))
-    doc_ref.set({ "accessToken": access_token, "refreshToken": refresh_token })
+# The maximum number of writes Firestore allows in a single batch.
+MAX_BATCH_SIZE = 500
 
-def get_token(user_name: str) -> dict | None:
-    """Fetches the user's OAuth2 tokens from storage."""
-    doc = db.collection(USERS_COLLECTION).document(user_name.replace(USERS_PREFIX, "")).get()
-    if doc.exists:
-        return doc.to_dict()
-    return None
+# The maximum number of batches sent to Firestore concurrently.
+MAX_CONCURRENT_BATCHES = 8
+
+def _document_id(user_name: str) -> str:
+    """Returns the ID of the document that stores the user's tokens."""
+    return user_name.replace(USERS_PREFIX, "")
+
+def _chunks(items: list, size: int = MAX_BATCH_SIZE) -> list[list]:
+    """Splits a list into chunks that fit within the Firestore limits."""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+class FirestoreTokenStore(TokenStore):
+    """Stores tokens in a Firestore database.
+    The Firestore client is created on first use, so creating the store
+    doesn't connect to Firestore."""
+
+    def __init__(self, database: str = DATABASE):
+        self.database = database
+        self._db = None
+        self._lock = threading.Lock()
+
+    @property
+    def db(self) -> firestore.Client:
+        """The Firestore client, using Application Default Credentials."""
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    self._db = firestore.Client(database=self.database)
+        return self._db
+
+    def _document(self, user_name: str) -> firestore.DocumentReference:
+        return self.db.collection(USERS_COLLECTION).document(_document_id(user_name))
+
+    def store_token(self, user_name: str, access_token: str, refresh_token: str):
+        self._document(user_name).set(
+            { "accessToken": access_token, "refreshToken": refresh_token })
+
+    def get_token(self, user_name: str) -> dict | None:
+        doc = self._document(user_name).get()
+        if doc.exists:
+            return doc.to_dict()
+        return None
+
+    def delete_token(self, user_name: str):
+        self._document(user_name).delete()
+
+    def store_tokens_bulk(self, tokens: dict[str, dict]):
+        """Saves the OAuth2 tokens of many users using batched writes,
+        committing several batches concurrently."""
+        def commit(chunk: list[tuple[str, dict]]):
+            batch = self.db.batch()
+            for user_name, user_tokens in chunk:
+                batch.set(self._document(user_name), {
+                    "accessToken": user_tokens["accessToken"],
+                    "refreshToken": user_tokens["refreshToken"]
+                })
+            batch.commit()
+
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_BATCHES) as executor:
+            # Consume the results so that any error is raised to the caller.
+            list(executor.map(commit, _chunks(list(tokens.items()))))
+
+    def get_tokens_bulk(self, user_names: list[str]) -> dict[str, dict]:
+        """Fetches the OAuth2 tokens of many users with concurrent get_all
+        calls. Users without stored tokens are omitted from the result."""
+        ids_to_names = {_document_id(user_name): user_name for user_name in user_names}
+
+        def fetch(chunk: list[str]) -> dict[str, dict]:
+            doc_refs = [self.db.collection(USERS_COLLECTION).document(doc_id)
+                        for doc_id in chunk]
+            return {
+                ids_to_names[doc.id]: doc.to_dict()
+                for doc in self.db.get_all(doc_refs) if doc.exists
+            }
+
+        tokens = {}
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_BATCHES) as executor:
+            for chunk_tokens in executor.map(fetch, _chunks(list(ids_to_names))):
+                tokens.update(chunk_tokens)
+        return tokens
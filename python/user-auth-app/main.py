@@ -19,9 +19,11 @@ import logging
 import os
 import flask
 from werkzeug.middleware.proxy_fix import ProxyFix
-from request_verifier import verify_google_chat_request
-from oauth_flow import oauth2callback
-from user_auth_post import post_with_user_credentials
+
+# The modules that handle Chat events and the OAuth flow load the Google client
+# libraries, so they are imported on first use inside the routes. This keeps
+# cold starts fast for instances that only serve GET requests, such as health
+# checks.
 
 logging.basicConfig(
     level=logging.INFO,
@@ -40,6 +42,8 @@ def on_get() -> dict:
 @app.route("/", methods=["POST"])
 def on_event() -> dict:
     """App route that responds to interaction events from Google Chat."""
+    from request_verifier import verify_google_chat_request
+    from user_auth_post import post_with_user_credentials
     if not verify_google_chat_request(flask.request):
         return "Hello! This endpoint is meant to be called from Google Chat."
     if event := flask.request.get_json(silent=True):
@@ -57,6 +61,7 @@ def on_oauth2():
     credentials, stores the authentication and refresh tokens in the database,
     and redirects the request to the config complete URL provided in the request.
     """
+    from oauth_flow import oauth2callback
     return oauth2callback(flask.request.url)
 
 if __name__ == "__main__":
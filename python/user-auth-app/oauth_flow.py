@@ -14,23 +14,30 @@
 
 """Functions to handle the OAuth authentication flow."""
 
+from __future__ import annotations
+
+import functools
 import json
 import logging
+from typing import TYPE_CHECKING
 from urllib.parse import parse_qs, urlparse
 
 import flask
-import google_auth_oauthlib.flow
-from google.auth.transport import requests
-from google.oauth2 import id_token
-from google.oauth2.credentials import Credentials
-from firestore_service import store_token
+from token_store import store_token
+
+# The Google Auth libraries are imported on first use to keep cold starts fast.
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
 
 # This variable specifies the name of a file that contains the OAuth 2.0
 # information for this application, including its client_id and client_secret.
 CLIENT_SECRETS_FILE = "client_secrets.json"
 
-# Application OAuth credentials.
-KEYS = json.load(open(CLIENT_SECRETS_FILE, encoding="UTF-8"))["web"]
+@functools.cache
+def get_keys() -> dict:
+    """Returns the application OAuth credentials, read on first use."""
+    with open(CLIENT_SECRETS_FILE, encoding="UTF-8") as f:
+        return json.load(f)["web"]
 
 # Define the app's authorization scopes.
 # Note: 'openid' is required to that Google Auth will return a JWT with the
@@ -40,9 +47,10 @@ SCOPES = ["openid", "https://www.googleapis.com/auth/chat.messages.create"]
 
 def generate_auth_url(user_name: str, config_complete_redirect_url: str) -> str:
     """Generates the URL to start the OAuth2 authorization flow."""
+    import google_auth_oauthlib.flow
     flow = google_auth_oauthlib.flow.Flow.from_client_secrets_file(
         CLIENT_SECRETS_FILE, scopes=SCOPES)
-    flow.redirect_uri = KEYS["redirect_uris"][0]
+    flow.redirect_uri = get_keys()["redirect_uris"][0]
     # Generate URL for request to Google's OAuth 2.0 server.
     auth_url, _ = flow.authorization_url(
         # Enable offline access so that you can refresh an access token without
@@ -59,26 +67,31 @@ def generate_auth_url(user_name: str, config_complete_redirect_url: str) -> str:
 
 def create_credentials(access_token: str, refresh_token: str) -> Credentials:
     """Returns the Credentials to authenticate using the user tokens."""
+    from google.oauth2.credentials import Credentials
+    keys = get_keys()
     return Credentials(
         token = access_token,
         refresh_token = refresh_token,
-        token_uri = KEYS["token_uri"],
-        client_id = KEYS["client_id"],
-        client_secret = KEYS["client_secret"],
+        token_uri = keys["token_uri"],
+        client_id = keys["client_id"],
+        client_secret = keys["client_secret"],
         scopes = SCOPES
     )
 
 def oauth2callback(url: str):
     """Handles an OAuth2 callback request.
     If the authorization was succesful, it exchanges the received code with the
-    access and refresh tokens and saves them into Firestore to be used when
+    access and refresh tokens and saves them into the token store to be used when
     calling the Chat API. Then, it redirects the response to the
     configCompleteRedirectUrl specified in the authorization URL.
     If the authorization fails, it just prints an error message to the response.
     """
+    import google_auth_oauthlib.flow
+    from google.oauth2 import id_token
+    from request_verifier import get_auth_request
     flow = google_auth_oauthlib.flow.Flow.from_client_secrets_file(
         CLIENT_SECRETS_FILE, scopes=SCOPES)
-    flow.redirect_uri = KEYS["redirect_uris"][0]
+    flow.redirect_uri = get_keys()["redirect_uris"][0]
 
     # Fetch state from url
     parsed = urlparse(url)
@@ -96,7 +109,7 @@ def oauth2callback(url: str):
     flow.fetch_token(code=code)
     credentials = flow.credentials
     token = id_token.verify_oauth2_token(
-        credentials.id_token, requests.Request(), KEYS["client_id"])
+        credentials.id_token, get_auth_request(), get_keys()["client_id"])
     user_name = "users/" + token["sub"]
 
     # Save tokens to the database so the app can use them to make API calls.
@@ -0,0 +1,168 @@
+# Copyright 2025 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Queue that posts messages to Google Chat from a pool of background workers,
+so that the HTTP response to a Chat event doesn't wait for the Chat API."""
+
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, Callable, NamedTuple
+
+from google.api_core.exceptions import (
+    DeadlineExceeded,
+    InternalServerError,
+    ResourceExhausted,
+    ServiceUnavailable,
+    Unauthenticated,
+)
+
+# Errors returned by the Chat API that are worth retrying.
+TRANSIENT_ERRORS = (
+    DeadlineExceeded,
+    InternalServerError,
+    ResourceExhausted,
+    ServiceUnavailable,
+)
+
+# Number of worker threads posting messages concurrently.
+NUM_WORKERS = int(os.environ.get("POST_QUEUE_WORKERS", "8"))
+
+# Maximum number of messages waiting to be posted.
+MAX_QUEUE_SIZE = int(os.environ.get("POST_QUEUE_SIZE", "1000"))
+
+# Maximum number of attempts to post a message before giving up.
+MAX_ATTEMPTS = int(os.environ.get("POST_QUEUE_MAX_ATTEMPTS", "5"))
+
+# Delay in seconds before the first retry, doubled on every attempt.
+INITIAL_BACKOFF = 0.5
+
+# Upper bound in seconds for the delay between retries.
+MAX_BACKOFF = 10.0
+
+
+class PostJob(NamedTuple):
+    """A message waiting to be posted with the credentials of a user."""
+    user_name: str
+    credentials: Any
+    request: Any
+
+
+class PostQueue:
+    """Posts Chat API messages from a bounded pool of worker threads.
+
+    Messages are retried with exponential backoff and jitter on transient
+    errors. If the Chat API rejects the user credentials, the message is
+    dropped and the on_unauthenticated callback is called with the user name
+    and the rejected credentials, so the app can request authorization again
+    the next time the user interacts with it.
+
+    The queue lives in the process memory: messages still queued when the
+    process exits are lost.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[Any], Any],
+        on_unauthenticated: Callable[[str, Any], None],
+        num_workers: int = NUM_WORKERS,
+        max_queue_size: int = MAX_QUEUE_SIZE,
+        max_attempts: int = MAX_ATTEMPTS,
+        initial_backoff: float = INITIAL_BACKOFF,
+    ):
+        self.client_factory = client_factory
+        self.on_unauthenticated = on_unauthenticated
+        self.num_workers = num_workers
+        self.max_attempts = max_attempts
+        self.initial_backoff = initial_backoff
+        self.jobs = queue.Queue(maxsize=max_queue_size)
+        self.workers = []
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Starts the worker threads, if they are not running yet.
+        Workers are started lazily so that the queue is safe to create before
+        the web server forks its worker processes."""
+        with self.lock:
+            if self.workers:
+                return
+            for i in range(self.num_workers):
+                worker = threading.Thread(
+                    target=self._run, name=f"post-queue-{i}", daemon=True)
+                worker.start()
+                self.workers.append(worker)
+
+    def enqueue(self, user_name: str, credentials: Any, request: Any) -> bool:
+        """Adds a message to the queue. Returns False if the queue is full."""
+        self.start()
+        try:
+            self.jobs.put_nowait(PostJob(user_name, credentials, request))
+        except queue.Full:
+            logging.warning("Post queue is full, dropping to inline post.")
+            return False
+        return True
+
+    def join(self):
+        """Blocks until every queued message has been processed."""
+        self.jobs.join()
+
+    def stop(self):
+        """Stops the worker threads after the queued messages are processed."""
+        with self.lock:
+            for _ in self.workers:
+                self.jobs.put(None)
+            for worker in self.workers:
+                worker.join()
+            self.workers = []
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    return
+                self.post(job)
+            finally:
+                self.jobs.task_done()
+
+    def post(self, job: PostJob) -> bool:
+        """Posts a message, retrying on transient errors.
+        Returns whether the message was posted."""
+        client = self.client_factory(job.credentials)
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                client.create_message(job.request)
+                return True
+            except Unauthenticated:
+                # This error probably happened because the user revoked the
+                # authorization, so the app must request configuration again.
+                logging.warning(
+                    "Credentials rejected for user %s, dropping message.",
+                    job.user_name)
+                self.on_unauthenticated(job.user_name, job.credentials)
+                return False
+            except TRANSIENT_ERRORS as e:
+                if attempt == self.max_attempts:
+                    logging.error("Giving up posting message after %d attempts: %s",
+                                  attempt, e)
+                    return False
+                backoff = min(MAX_BACKOFF, self.initial_backoff * 2 ** (attempt - 1))
+                time.sleep(random.uniform(0, backoff))
+            except Exception:
+                logging.exception("Failed to post message.")
+                return False
+        return False
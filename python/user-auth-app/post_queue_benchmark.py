@@ -0,0 +1,98 @@
+# Copyright 2025 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks the throughput of the post queue against a local fake Chat
+service that simulates the latency and transient errors of the Chat API.
+
+Usage:
+    python post_queue_benchmark.py [--messages N] [--latency SECONDS]
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from google.api_core.exceptions import ServiceUnavailable
+from post_queue import PostQueue
+
+
+class FakeChatService:
+    """In-process stand-in for the Chat API that records posted messages."""
+
+    def __init__(self, latency: float, error_rate: float):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.posted = 0
+        self.lock = threading.Lock()
+
+    def create_message(self, request):
+        """Simulates a call to the Chat API."""
+        time.sleep(self.latency)
+        if random.random() < self.error_rate:
+            raise ServiceUnavailable("Fake Chat service unavailable.")
+        with self.lock:
+            self.posted += 1
+        return request
+
+
+def run_inline(service: FakeChatService, messages: int) -> float:
+    """Posts every message inline, like a blocking webhook handler would."""
+    start = time.perf_counter()
+    for i in range(messages):
+        try:
+            service.create_message(i)
+        except ServiceUnavailable:
+            pass
+    return time.perf_counter() - start
+
+
+def run_queued(service: FakeChatService, messages: int, workers: int) -> float:
+    """Posts every message through the post queue and waits for it to drain."""
+    post_queue = PostQueue(
+        lambda credentials: service,
+        lambda user_name, credentials: None,
+        num_workers=workers,
+        max_queue_size=messages,
+        initial_backoff=0.01)
+    start = time.perf_counter()
+    for i in range(messages):
+        post_queue.enqueue("users/benchmark", None, i)
+    post_queue.join()
+    elapsed = time.perf_counter() - start
+    post_queue.stop()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    inline = FakeChatService(args.latency, args.error_rate)
+    elapsed = run_inline(inline, args.messages)
+    print(f"inline: {inline.posted}/{args.messages} posted, "
+          f"{args.messages / elapsed:.1f} msg/s")
+
+    queued = FakeChatService(args.latency, args.error_rate)
+    elapsed = run_queued(queued, args.messages, args.workers)
+    print(f"queued ({args.workers} workers): {queued.posted}/{args.messages} "
+          f"posted, {args.messages / elapsed:.1f} msg/s")
+
+
+if __name__ == "__main__":
+    main()
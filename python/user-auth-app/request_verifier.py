@@ -14,13 +14,25 @@
 
 """Utility to verify that an HTTP request was sent by Google Chat."""
 
+import functools
+import cachecontrol
 import flask
-from google.auth.transport import requests
+import requests
+from google.auth.transport import requests as auth_requests
 from google.oauth2 import id_token
 
 # Bearer Tokens received by apps will always specify this issuer.
 CHAT_ISSUER = 'chat@system.gserviceaccount.com'
 
+@functools.cache
+def get_auth_request() -> auth_requests.Request:
+    """Returns the transport used to verify ID tokens.
+    It reuses pooled HTTP connections and caches Google's public certificates
+    for as long as their Cache-Control headers allow, so verifying a token
+    doesn't download the certificates every time. It's shared by the
+    verification of Chat requests and of OAuth2 callbacks."""
+    return auth_requests.Request(session=cachecontrol.CacheControl(requests.Session()))
+
 def verify_google_chat_request(request: flask.Request) -> bool:
     """Verifies that an HTTP request was sent by Google Chat."""
     try:
@@ -31,7 +43,7 @@ def verify_google_chat_request(request: flask.Request) -> bool:
         audience = request.base_url
         # Verify valid token, signed by CHAT_ISSUER, intended for a third party.
         token = id_token.verify_oauth2_token(
-            bearer_token, requests.Request(), audience)
+            bearer_token, get_auth_request(), audience)
         return token["email"] == CHAT_ISSUER
     except Exception:
         return False
@@ -0,0 +1,56 @@
+# Copyright 2025 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the bulk token operations, run against the Firestore emulator:
+
+    gcloud emulators firestore start --host-port=localhost:8085
+    FIRESTORE_EMULATOR_HOST=localhost:8085 python -m unittest discover -s tests -p '*_test.py'
+"""
+
+import os
+import unittest
+
+@unittest.skipUnless(os.environ.get("FIRESTORE_EMULATOR_HOST"),
+                     "Requires the Firestore emulator.")
+class FirestoreServiceBulkTest(unittest.TestCase):
+    # More users than fit in a single batch, to exercise chunking.
+    NUM_USERS = 1234
+
+    def setUp(self):
+        # Imported here so that the test module loads without Firestore.
+        from firestore_service import FirestoreTokenStore
+        self.service = FirestoreTokenStore()
+
+    def testStoreAndGetTokensBulk(self):
+        tokens = {
+            f"users/bulk{i}": {
+                "accessToken": f"access{i}",
+                "refreshToken": f"refresh{i}"
+            }
+            for i in range(self.NUM_USERS)
+        }
+
+        self.service.store_tokens_bulk(tokens)
+
+        self.assertEqual(self.service.get_tokens_bulk(list(tokens)), tokens)
+        self.assertEqual(self.service.get_token("users/bulk7"), tokens["users/bulk7"])
+
+    def testGetTokensBulkOmitsMissingUsers(self):
+        self.service.store_token("users/present", "access", "refresh")
+
+        result = self.service.get_tokens_bulk(["users/present", "users/missing"])
+
+        self.assertEqual(result, {
+            "users/present": { "accessToken": "access", "refreshToken": "refresh" }
+        })
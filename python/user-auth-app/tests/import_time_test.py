@@ -0,0 +1,60 @@
+# Copyright 2025 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Checks that importing the app doesn't load the libraries that make cold
+starts slow.
+
+The libraries are only imported when the app handles its first Chat event or
+OAuth callback.
+"""
+
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+# The directory that contains main.py.
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be imported until the app handles its first event.
+DEFERRED_MODULES = [
+    "google.apps.chat_v1",
+    "google.cloud.firestore",
+    "google.oauth2",
+    "google_auth_oauthlib",
+    "googleapiclient",
+    "grpc",
+]
+
+
+def imported_modules(module: str) -> set[str]:
+    """Imports a module in a new interpreter and returns the names of all the
+    modules loaded."""
+    code = f"import json, sys, {module}; print(json.dumps(list(sys.modules)))"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=APP_DIR, capture_output=True, text=True, check=True)
+    return set(json.loads(result.stdout.splitlines()[-1]))
+
+
+@unittest.skipUnless(importlib.util.find_spec("flask"), "Requires Flask.")
+class ImportTest(unittest.TestCase):
+
+    def testHeavyModulesAreDeferred(self):
+        modules = imported_modules("main")
+        self.assertIn("main", modules)
+        for module in DEFERRED_MODULES:
+            self.assertNotIn(module, modules)
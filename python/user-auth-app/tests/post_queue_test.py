@@ -0,0 +1,92 @@
+# Copyright 2025 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the background post queue."""
+
+import unittest
+from unittest import mock
+
+from google.api_core.exceptions import (
+    PermissionDenied, ServiceUnavailable, Unauthenticated)
+from post_queue import PostJob, PostQueue
+
+class PostQueueTest(unittest.TestCase):
+    USER_NAME = "users/123"
+
+    def setUp(self):
+        self.client = mock.Mock()
+        self.on_unauthenticated = mock.Mock()
+        self.credentials = mock.Mock()
+        self.post_queue = PostQueue(
+            lambda credentials: self.client, self.on_unauthenticated,
+            num_workers=2, max_attempts=3, initial_backoff=0)
+        self.job = PostJob(self.USER_NAME, self.credentials, "request")
+
+    def testPost(self):
+        self.assertTrue(self.post_queue.post(self.job))
+
+        self.client.create_message.assert_called_once_with("request")
+
+    def testRetriesTransientErrors(self):
+        self.client.create_message.side_effect = [
+            ServiceUnavailable("unavailable"), ServiceUnavailable("unavailable"),
+            None]
+
+        self.assertTrue(self.post_queue.post(self.job))
+
+        self.assertEqual(self.client.create_message.call_count, 3)
+
+    def testGivesUpAfterMaxAttempts(self):
+        self.client.create_message.side_effect = ServiceUnavailable("unavailable")
+
+        self.assertFalse(self.post_queue.post(self.job))
+
+        self.assertEqual(self.client.create_message.call_count, 3)
+        self.on_unauthenticated.assert_not_called()
+
+    def testDoesNotRetryOtherErrors(self):
+        self.client.create_message.side_effect = PermissionDenied("denied")
+
+        self.assertFalse(self.post_queue.post(self.job))
+
+        self.assertEqual(self.client.create_message.call_count, 1)
+
+    def testRejectedCredentials(self):
+        self.client.create_message.side_effect = Unauthenticated("rejected")
+
+        self.assertFalse(self.post_queue.post(self.job))
+
+        self.assertEqual(self.client.create_message.call_count, 1)
+        self.on_unauthenticated.assert_called_once_with(
+            self.USER_NAME, self.credentials)
+
+    def testWorkersPostQueuedMessages(self):
+        for i in range(10):
+            self.assertTrue(
+                self.post_queue.enqueue(self.USER_NAME, self.credentials, i))
+        self.post_queue.join()
+        self.post_queue.stop()
+
+        self.assertCountEqual(
+            [call.args[0] for call in self.client.create_message.call_args_list],
+            range(10))
+
+    def testEnqueueFailsWhenQueueIsFull(self):
+        # Without workers, nothing is taken from the queue.
+        post_queue = PostQueue(
+            lambda credentials: self.client, self.on_unauthenticated,
+            num_workers=0, max_queue_size=1)
+
+        self.assertTrue(post_queue.enqueue(self.USER_NAME, self.credentials, 1))
+        self.assertFalse(post_queue.enqueue(self.USER_NAME, self.credentials, 2))
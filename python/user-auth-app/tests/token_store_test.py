@@ -0,0 +1,83 @@
+# Copyright 2025 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the local token store backends."""
+
+import os
+import tempfile
+import unittest
+
+from token_store import (
+    InMemoryTokenStore, SqliteTokenStore, TokenStore, create_store)
+
+class TokenStoreTestMixin:
+    USER_NAME = "users/123"
+
+    def testGetMissingToken(self):
+        self.assertIsNone(self.store.get_token(self.USER_NAME))
+
+    def testStoreAndGetToken(self):
+        self.store.store_token(self.USER_NAME, "access", "refresh")
+
+        self.assertEqual(self.store.get_token(self.USER_NAME),
+            { "accessToken": "access", "refreshToken": "refresh" })
+
+    def testStoreTokenOverwrites(self):
+        self.store.store_token(self.USER_NAME, "access", "refresh")
+        self.store.store_token(self.USER_NAME, "access2", "refresh2")
+
+        self.assertEqual(self.store.get_token(self.USER_NAME),
+            { "accessToken": "access2", "refreshToken": "refresh2" })
+
+    def testDeleteToken(self):
+        self.store.store_token(self.USER_NAME, "access", "refresh")
+        self.store.delete_token(self.USER_NAME)
+
+        self.assertIsNone(self.store.get_token(self.USER_NAME))
+
+    def testBulkTokens(self):
+        tokens = {
+            f"users/{i}": { "accessToken": f"a{i}", "refreshToken": f"r{i}" }
+            for i in range(1200)
+        }
+
+        self.store.store_tokens_bulk(tokens)
+
+        self.assertEqual(self.store.get_tokens_bulk(list(tokens) + ["users/x"]), tokens)
+
+class InMemoryTokenStoreTest(TokenStoreTestMixin, unittest.TestCase):
+    def setUp(self):
+        self.store = InMemoryTokenStore()
+
+class SqliteTokenStoreTest(TokenStoreTestMixin, unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.store = SqliteTokenStore(os.path.join(self.tempdir.name, "tokens.db"))
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+class TokenStoreTest(unittest.TestCase):
+    def testBackendsMustImplementEveryMethod(self):
+        class PartialTokenStore(TokenStore):
+            def get_token(self, user_name):
+                return None
+
+        with self.assertRaises(TypeError):
+            PartialTokenStore()
+
+class CreateStoreTest(unittest.TestCase):
+    def testUnknownBackend(self):
+        with self.assertRaises(ValueError):
+            create_store("unknown")
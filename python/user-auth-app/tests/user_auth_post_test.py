@@ -0,0 +1,152 @@
+# Copyright 2025 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for posting messages with user credentials, and for the handling of
+tokens rejected by Google."""
+
+import unittest
+from unittest import mock
+
+import token_store
+import user_auth_post
+from google.api_core.exceptions import Unauthenticated
+from google.auth.exceptions import RefreshError, TransportError
+from token_store import InMemoryTokenStore
+from user_auth_post import delete_rejected_token
+
+class DeleteRejectedTokenTest(unittest.TestCase):
+    USER_NAME = "users/123"
+
+    def setUp(self):
+        self.store = InMemoryTokenStore()
+        patcher = mock.patch.object(token_store, "_store", self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def testDeletesRejectedToken(self):
+        self.store.store_token(self.USER_NAME, "access", "refresh")
+
+        delete_rejected_token(self.USER_NAME, mock.Mock(refresh_token="refresh"))
+
+        self.assertIsNone(self.store.get_token(self.USER_NAME))
+
+    def testKeepsTokenStoredAfterReauthorization(self):
+        self.store.store_token(self.USER_NAME, "access2", "refresh2")
+
+        delete_rejected_token(self.USER_NAME, mock.Mock(refresh_token="refresh"))
+
+        self.assertEqual(self.store.get_token(self.USER_NAME),
+            { "accessToken": "access2", "refreshToken": "refresh2" })
+
+    def testIgnoresMissingToken(self):
+        delete_rejected_token(self.USER_NAME, mock.Mock(refresh_token="refresh"))
+
+        self.assertIsNone(self.store.get_token(self.USER_NAME))
+
+class PostWithUserCredentialsTest(unittest.TestCase):
+    USER_NAME = "users/123"
+    EVENT = {
+        "message": {
+            "text": "Hello",
+            "thread": { "name": "spaces/AAA/threads/BBB" }
+        },
+        "space": { "name": "spaces/AAA" },
+        "user": { "name": USER_NAME, "displayName": "Alice" },
+        "configCompleteRedirectUrl": "https://chat.google.com/redirect"
+    }
+    CONFIG_REQUEST = {
+        "actionResponse": {
+            "type": "REQUEST_CONFIG",
+            "url": "https://accounts.google.com/auth"
+        }
+    }
+
+    def setUp(self):
+        self.store = InMemoryTokenStore()
+        self.store.store_token(self.USER_NAME, "access", "refresh")
+        self.credentials = mock.Mock(refresh_token="refresh", expired=False)
+        self.create_credentials = mock.Mock(return_value=self.credentials)
+        self.post_queue = mock.Mock()
+        self.post_queue.enqueue.return_value = True
+        self.chat_client = mock.Mock()
+        for patcher in [
+            mock.patch.object(token_store, "_store", self.store),
+            mock.patch.object(
+                user_auth_post, "create_credentials", self.create_credentials),
+            mock.patch.object(user_auth_post, "generate_auth_url",
+                return_value="https://accounts.google.com/auth"),
+            mock.patch.object(user_auth_post, "post_queue", self.post_queue),
+            mock.patch.object(user_auth_post, "create_chat_client",
+                return_value=self.chat_client),
+            mock.patch.dict(user_auth_post.checked_credentials, clear=True),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def testRequestsConfigWithoutTokens(self):
+        self.store.delete_token(self.USER_NAME)
+
+        self.assertEqual(user_auth_post.post_with_user_credentials(self.EVENT),
+            self.CONFIG_REQUEST)
+        self.post_queue.enqueue.assert_not_called()
+
+    def testQueuesMessage(self):
+        self.assertEqual(user_auth_post.post_with_user_credentials(self.EVENT), {})
+
+        self.credentials.refresh.assert_called_once()
+        user_name, credentials, request = self.post_queue.enqueue.call_args.args
+        self.assertEqual(user_name, self.USER_NAME)
+        self.assertIs(credentials, self.credentials)
+        self.assertEqual(request.parent, "spaces/AAA")
+        self.assertEqual(request.message.text, "Alice said: Hello")
+        self.chat_client.create_message.assert_not_called()
+
+    def testRequestsConfigWhenRefreshTokenIsRejected(self):
+        self.credentials.refresh.side_effect = RefreshError("invalid_grant")
+
+        self.assertEqual(user_auth_post.post_with_user_credentials(self.EVENT),
+            self.CONFIG_REQUEST)
+        self.assertIsNone(self.store.get_token(self.USER_NAME))
+        self.post_queue.enqueue.assert_not_called()
+
+    def testQueuesMessageWhenRefreshFailsTemporarily(self):
+        self.credentials.refresh.side_effect = TransportError("unreachable")
+
+        self.assertEqual(user_auth_post.post_with_user_credentials(self.EVENT), {})
+        self.post_queue.enqueue.assert_called_once()
+        self.assertIsNotNone(self.store.get_token(self.USER_NAME))
+
+    def testChecksCredentialsOnceUntilTheyExpire(self):
+        user_auth_post.post_with_user_credentials(self.EVENT)
+        user_auth_post.post_with_user_credentials(self.EVENT)
+
+        self.assertEqual(self.credentials.refresh.call_count, 1)
+
+        self.credentials.expired = True
+        user_auth_post.post_with_user_credentials(self.EVENT)
+
+        self.assertEqual(self.credentials.refresh.call_count, 2)
+
+    def testPostsInlineWhenQueueIsFull(self):
+        self.post_queue.enqueue.return_value = False
+
+        self.assertEqual(user_auth_post.post_with_user_credentials(self.EVENT), {})
+        self.chat_client.create_message.assert_called_once()
+
+    def testRequestsConfigWhenInlinePostIsRejected(self):
+        self.post_queue.enqueue.return_value = False
+        self.chat_client.create_message.side_effect = Unauthenticated("rejected")
+
+        self.assertEqual(user_auth_post.post_with_user_credentials(self.EVENT),
+            self.CONFIG_REQUEST)
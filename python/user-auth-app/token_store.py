@@ -0,0 +1,193 @@
+# Copyright 2025 Google LLC. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Storage for the users' OAuth2 tokens, with pluggable backends.
+
+The backend is selected with the TOKEN_STORE environment variable:
+- firestore (default): a Firestore database, see firestore_service.py.
+- sqlite: a local SQLite database file in WAL mode, at TOKEN_STORE_PATH.
+- memory: a dictionary in the process memory, lost when the process exits.
+
+The SQLite and memory backends aren't shared between processes or instances,
+so they're only suitable for local development or a single instance.
+"""
+
+import abc
+import os
+import sqlite3
+import threading
+
+# The backend used to store tokens.
+TOKEN_STORE = os.environ.get("TOKEN_STORE", "firestore")
+
+# The path of the database file used by the SQLite backend. The default is in
+# /tmp, the only writable directory on App Engine, which is kept in the memory
+# of each instance and cleared when the instance stops.
+TOKEN_STORE_PATH = os.environ.get("TOKEN_STORE_PATH", "/tmp/tokens.db")
+
+# The maximum number of users fetched by a single SQLite query.
+SQLITE_QUERY_SIZE = 500
+
+class TokenStore(abc.ABC):
+    """Interface of a storage backend for the users' OAuth2 tokens.
+    Tokens are returned as dicts with the accessToken and refreshToken keys."""
+
+    @abc.abstractmethod
+    def store_token(self, user_name: str, access_token: str, refresh_token: str):
+        """Saves the user's OAuth2 tokens to storage."""
+
+    @abc.abstractmethod
+    def get_token(self, user_name: str) -> dict | None:
+        """Fetches the user's OAuth2 tokens from storage."""
+
+    @abc.abstractmethod
+    def delete_token(self, user_name: str):
+        """Deletes the user's OAuth2 tokens from storage."""
+
+    def store_tokens_bulk(self, tokens: dict[str, dict]):
+        """Saves the OAuth2 tokens of many users, keyed by user name."""
+        for user_name, user_tokens in tokens.items():
+            self.store_token(
+                user_name, user_tokens["accessToken"], user_tokens["refreshToken"])
+
+    def get_tokens_bulk(self, user_names: list[str]) -> dict[str, dict]:
+        """Fetches the OAuth2 tokens of many users, keyed by user name.
+        Users without stored tokens are omitted from the result."""
+        tokens = {}
+        for user_name in user_names:
+            if (user_tokens := self.get_token(user_name)) is not None:
+                tokens[user_name] = user_tokens
+        return tokens
+
+class InMemoryTokenStore(TokenStore):
+    """Stores tokens in the process memory."""
+
+    def __init__(self):
+        self.tokens = {}
+        self.lock = threading.Lock()
+
+    def store_token(self, user_name: str, access_token: str, refresh_token: str):
+        with self.lock:
+            self.tokens[user_name] = {
+                "accessToken": access_token, "refreshToken": refresh_token }
+
+    def get_token(self, user_name: str) -> dict | None:
+        with self.lock:
+            user_tokens = self.tokens.get(user_name)
+        return dict(user_tokens) if user_tokens is not None else None
+
+    def delete_token(self, user_name: str):
+        with self.lock:
+            self.tokens.pop(user_name, None)
+
+
+class SqliteTokenStore(TokenStore):
+    """Stores tokens in a local SQLite database.
+
+    The database uses write-ahead logging so that readers don't block the
+    writer, and each thread uses its own connection."""
+
+    def __init__(self, path: str = TOKEN_STORE_PATH):
+        self.path = path
+        self.local = threading.local()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS tokens ("
+                "user_name TEXT PRIMARY KEY, "
+                "access_token TEXT, "
+                "refresh_token TEXT)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Returns the database connection of the calling thread."""
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
+
+    def store_token(self, user_name: str, access_token: str, refresh_token: str):
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO tokens VALUES (?, ?, ?)",
+                (user_name, access_token, refresh_token))
+
+    def get_token(self, user_name: str) -> dict | None:
+        row = self._connection().execute(
+            "SELECT access_token, refresh_token FROM tokens WHERE user_name = ?",
+            (user_name,)).fetchone()
+        if row is None:
+            return None
+        return { "accessToken": row[0], "refreshToken": row[1] }
+
+    def delete_token(self, user_name: str):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM tokens WHERE user_name = ?", (user_name,))
+
+    def store_tokens_bulk(self, tokens: dict[str, dict]):
+        # Write every token in a single transaction.
+        with self._connection() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO tokens VALUES (?, ?, ?)",
+                [(user_name, user_tokens["accessToken"], user_tokens["refreshToken"])
+                 for user_name, user_tokens in tokens.items()])
+
+    def get_tokens_bulk(self, user_names: list[str]) -> dict[str, dict]:
+        tokens = {}
+        for i in range(0, len(user_names), SQLITE_QUERY_SIZE):
+            chunk = user_names[i:i + SQLITE_QUERY_SIZE]
+            rows = self._connection().execute(
+                "SELECT user_name, access_token, refresh_token FROM tokens "
+                f"WHERE user_name IN ({','.join('?' * len(chunk))})", chunk)
+            for user_name, access_token, refresh_token in rows:
+                tokens[user_name] = {
+                    "accessToken": access_token, "refreshToken": refresh_token }
+        return tokens
+
+_store = None
+_store_lock = threading.Lock()
+
+def create_store(backend: str = TOKEN_STORE) -> TokenStore:
+    """Creates a token store for the given backend name."""
+    if backend == "memory":
+        return InMemoryTokenStore()
+    if backend == "sqlite":
+        return SqliteTokenStore()
+    if backend == "firestore":
+        # Imported here so that the Firestore library is only loaded when used.
+        from firestore_service import FirestoreTokenStore
+        return FirestoreTokenStore()
+    raise ValueError(f"Unknown token store backend: {backend}")
+
+def get_store() -> TokenStore:
+    """Returns the token store of the app, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_store()
+    return _store
+
+def store_token(user_name: str, access_token: str, refresh_token: str):
+    """Saves the user's OAuth2 tokens to the app's token store."""
+    get_store().store_token(user_name, access_token, refresh_token)
+
+def get_token(user_name: str) -> dict | None:
+    """Fetches the user's OAuth2 tokens from the app's token store."""
+    return get_store().get_token(user_name)
+
+def delete_token(user_name: str):
+    """Deletes the user's OAuth2 tokens from the app's token store."""
+    get_store().delete_token(user_name)
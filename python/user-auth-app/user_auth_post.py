@@ -15,15 +15,96 @@
 """Function to post a message to a Google Chat space using the credentials of
 the calling user."""
 
-from google.api_core.exceptions import Unauthenticated
-from google.apps import chat_v1 as google_chat
-from firestore_service import get_token
+from __future__ import annotations
+
+import collections
+import logging
+import threading
+from typing import TYPE_CHECKING
+
 from oauth_flow import create_credentials, generate_auth_url, SCOPES
+from post_queue import PostQueue
+from token_store import delete_token, get_token
+
+# The Chat API and Google Auth libraries are imported on first use to keep cold
+# starts fast.
+if TYPE_CHECKING:
+    from google.apps import chat_v1 as google_chat
+    from google.oauth2.credentials import Credentials
+
+# The maximum number of users whose checked credentials are kept in memory.
+MAX_CHECKED_USERS = 10000
+
+# Credentials that were refreshed by this instance, by user name, so that the
+# user's authorization is checked again only once their access token expires.
+checked_credentials = collections.OrderedDict()
+checked_credentials_lock = threading.Lock()
+
+def create_chat_client(credentials) -> google_chat.ChatServiceClient:
+    """Returns a Chat API client that authenticates with the given credentials."""
+    from google.apps import chat_v1 as google_chat
+    return google_chat.ChatServiceClient(
+        credentials = credentials,
+        client_options = {
+            "scopes" : SCOPES
+        }
+    )
+
+def get_checked_credentials(user_name: str, tokens: dict) -> Credentials:
+    """Returns credentials to authenticate with the user's OAuth2 tokens.
+    The access token is refreshed synchronously, unless this instance already
+    refreshed it and it hasn't expired yet, so that a revoked authorization is
+    detected before the message is queued.
+    Raises google.auth.exceptions.RefreshError if the refresh token was rejected,
+    for example because the user revoked the authorization."""
+    with checked_credentials_lock:
+        credentials = checked_credentials.get(user_name)
+        if (credentials is not None and not credentials.expired
+                and credentials.refresh_token == tokens["refreshToken"]):
+            checked_credentials.move_to_end(user_name)
+            return credentials
+
+    from google.auth.exceptions import RefreshError, TransportError
+    from google.auth.transport.requests import Request
+    credentials = create_credentials(
+        tokens["accessToken"], tokens["refreshToken"])
+    try:
+        credentials.refresh(Request())
+    except (RefreshError, TransportError) as e:
+        if isinstance(e, RefreshError) and not e.retryable:
+            raise
+        # The authorization server is unavailable, so the credentials are used
+        # unchecked, and checked again with the next message.
+        logging.warning("Could not refresh credentials of user %s: %s",
+                        user_name, e)
+        return credentials
+    with checked_credentials_lock:
+        checked_credentials[user_name] = credentials
+        checked_credentials.move_to_end(user_name)
+        if len(checked_credentials) > MAX_CHECKED_USERS:
+            checked_credentials.popitem(last=False)
+    return credentials
+
+def delete_rejected_token(user_name: str, credentials):
+    """Deletes the user's OAuth2 tokens after the Chat API rejected them, so that
+    the next interaction requests configuration again.
+    The tokens are kept if the user authorized the app again since the message
+    was queued, since the stored tokens then differ from the rejected ones."""
+    tokens = get_token(user_name)
+    if tokens is not None and tokens["refreshToken"] == credentials.refresh_token:
+        delete_token(user_name)
+
+# Posts messages in the background. If the Chat API rejects the saved tokens,
+# they are deleted so that the next interaction requests configuration again.
+post_queue = PostQueue(create_chat_client, delete_rejected_token)
 
 def post_with_user_credentials(event: dict) -> dict:
     """Posts a message to a Google Chat space by calling the Chat API with user
     credentials.
-    The message is posted to the same space as the received event.
+    The message is posted to the same space as the received event. The Chat API
+    call is queued and made in the background, so the response doesn't wait
+    for it. If the Chat API rejects the user's credentials in the background,
+    the message is dropped and the next interaction requests configuration.
     If the user has not authorized the app to use their credentials yet, instead
     of posting the message, this functions returns a configuration request to
     start the OAuth authorization flow.
@@ -41,17 +122,19 @@ def post_with_user_credentials(event: dict) -> dict:
         # Request configuration to obtain OAuth2 tokens.
         return get_config_request(event)
 
-    # Authenticate with the user's OAuth2 tokens.
-    credentials = create_credentials(
-        tokens["accessToken"], tokens["refreshToken"])
+    from google.api_core.exceptions import Unauthenticated
+    from google.auth.exceptions import RefreshError
 
-    # Create the Chat API client with user credentials.
-    chat_client = google_chat.ChatServiceClient(
-        credentials = credentials,
-        client_options = {
-            "scopes" : SCOPES
-        }
-    )
+    try:
+        # Authenticate with the user's OAuth2 tokens.
+        credentials = get_checked_credentials(user_name, tokens)
+    except RefreshError:
+        # The user revoked the authorization, so let's delete the tokens and
+        # request configuration again.
+        delete_token(user_name)
+        return get_config_request(event)
+
+    from google.apps import chat_v1 as google_chat
 
     # Initialize request arguments
     request = google_chat.CreateMessageRequest(
@@ -69,9 +152,13 @@ def post_with_user_credentials(event: dict) -> dict:
         }
     )
 
+    # Queue the Chat API call and respond right away.
+    if post_queue.enqueue(user_name, credentials, request):
+        return {}
+
     try:
-        # Call Chat API.
-        chat_client.create_message(request)
+        # The queue is full, so call Chat API inline.
+        create_chat_client(credentials).create_message(request)
     except Unauthenticated:
         # This error probably happened because the user revoked the authorization.
         # So, let's request configuration again.